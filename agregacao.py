@@ -0,0 +1,128 @@
+"""Agregados do relatório a partir de contagens em formato longo.
+
+Todo número do relatório é uma contagem de inscrições por (dimensão, valor,
+Status). Guardar só essas contagens torna os agregados aditivos: dá para
+somar/subtrair deltas (ver snapshot.py) ou blocos de um export lido em
+streaming (ver processamento.agregados_blocos) e depois montar KPIs, tabelas e
+séries dos gráficos exatamente como o cálculo completo faria.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from limpeza import STATUS
+from medicao import etapa
+
+# UF só conta para inscritos do Brasil; Semana é o rótulo do pd.Grouper(freq='W')
+DIMENSOES = ['Categoria', 'Pais', 'UF', 'Regiao', 'FaixaEtaria', 'Semana']
+TOTAL = 'Total'
+CHAVE_CONTAGEM = ['dimensao', 'valor', 'status']
+
+Agregados = namedtuple('Agregados', ['kpis', 'tb_cat', 'tb_pais', 'tb_uf', 'd_reg', 'd_id', 'df_evo'])
+
+
+def semana(datas):
+    """Domingo que fecha a semana de cada data (mesmo rótulo do Grouper 'W'), em ISO."""
+    dias = datas.to_numpy(dtype='datetime64[ns]').astype('datetime64[D]')
+    # 1970-01-01 foi quinta: (dias + 3) % 7 dá 0 na segunda
+    fim = dias + (6 - (dias.astype('int64') + 3) % 7)
+    # strftime só nas semanas distintas (dezenas), não nas linhas
+    codigos, unicos = pd.factorize(fim)
+    rotulos = np.array([pd.Timestamp(u).strftime('%Y-%m-%d') for u in unicos] + [np.nan], dtype=object)
+    return pd.Series(rotulos[codigos], index=datas.index)
+
+
+def dimensoes(df_clean):
+    """Uma linha por inscrição com só o que entra nas contagens."""
+    return pd.DataFrame({
+        'Categoria': df_clean['Categoria'],
+        'Pais': df_clean['Pais'],
+        'UF': df_clean['UF'].where(df_clean['Pais'] == 'BRASIL'),
+        'Regiao': df_clean['Regiao'],
+        'FaixaEtaria': df_clean['FaixaEtaria'],
+        'Semana': semana(df_clean['DataGrafico']),
+        'Status': df_clean['Status'],
+    }, index=df_clean.index)
+
+
+def contagens(dims):
+    """Contagens longas (dimensao, valor, status, n); valores nulos não contam.
+
+    Uma passada por dimensão: o valor é fatorado em códigos e cada par
+    (valor, status) vira uma posição de um único np.bincount.
+    """
+    k = len(STATUS)
+    cod, vals = pd.factorize(dims['Status'])
+    st = np.array([STATUS.index(v) if v in STATUS else -1 for v in vals] + [-1], dtype='int64')[cod]
+    partes = [pd.DataFrame({'dimensao': TOTAL, 'valor': '', 'status': STATUS,
+                            'n': np.bincount(st[st >= 0], minlength=k)})]
+    for d in DIMENSOES:
+        codigos, valores = pd.factorize(dims[d])
+        ok = (codigos >= 0) & (st >= 0)
+        n = np.bincount(codigos[ok] * k + st[ok], minlength=len(valores) * k)
+        pos = np.flatnonzero(n)
+        partes.append(pd.DataFrame({'dimensao': d, 'valor': np.asarray(valores, dtype=object)[pos // k],
+                                    'status': np.array(STATUS, dtype=object)[pos % k], 'n': n[pos]}))
+    return pd.concat(partes, ignore_index=True)
+
+
+def somar(partes):
+    """Soma tabelas de contagens longas (n negativo subtrai)."""
+    c = pd.concat(partes, ignore_index=True)
+    return c.groupby(CHAVE_CONTAGEM, sort=False, dropna=False)['n'].sum().reset_index()
+
+
+def _por_status(cont, dim):
+    c = cont[(cont['dimensao'] == dim) & (cont['n'] > 0)]
+    r = c.set_index(['valor', 'status'])['n'].unstack(fill_value=0)
+    r.index.name, r.columns.name = dim, 'Status'
+    # Garante que as 3 colunas existem para não dar erro
+    for s in STATUS:
+        if s not in r.columns: r[s] = 0
+    return r.astype('int64')
+
+
+def tab(cont, dim):
+    r = _por_status(cont, dim)
+    r['Total'] = r['Pago']+r['Cortesia']+r['Aberto']
+    return r.sort_values('Total', ascending=False)
+
+
+def _contagem(cont, dim):
+    s = _por_status(cont, dim).sum(axis=1)
+    s.index.name, s.name = dim, 'count'
+    return s
+
+
+def agrupar_reg(c):
+    """Regiões com menos de 10% viram 'Outros'. Empates de contagem em ordem alfabética."""
+    c = c.iloc[np.lexsort((c.index.astype(str), -c.to_numpy()))]
+    p = c/c.sum(); m = c[p>=0.1]; mn = c[p<0.1].sum()
+    r = m.copy();
+    if mn>0: r['Outros'] = r.get('Outros',0)+mn
+    return r
+
+
+def montar(cont):
+    """KPIs, tabelas e séries dos gráficos a partir das contagens longas."""
+    tot = cont[cont['dimensao'] == TOTAL].groupby('status')['n'].sum()
+    kpis = (int(tot.sum()), int(tot.get('Pago', 0)), int(tot.get('Cortesia', 0)), int(tot.get('Aberto', 0)))
+
+    df_evo = _por_status(cont, 'Semana')
+    df_evo.index = pd.DatetimeIndex(pd.to_datetime(df_evo.index), name='DataGrafico')
+
+    return Agregados(
+        kpis=kpis,
+        tb_cat=tab(cont, 'Categoria'),
+        tb_pais=tab(cont, 'Pais'),
+        tb_uf=tab(cont, 'UF'),
+        d_reg=agrupar_reg(_contagem(cont, 'Regiao')),
+        d_id=_contagem(cont, 'FaixaEtaria').sort_index(),
+        df_evo=df_evo.sort_index(),
+    )
+
+
+def agregar(df_clean):
+    with etapa('agregacao', linhas=len(df_clean)):
+        return montar(contagens(dimensoes(df_clean)))
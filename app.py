@@ -1,34 +1,35 @@
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-import base64
-from io import BytesIO
-from datetime import datetime, timedelta
-import unicodedata
-from weasyprint import HTML
 import warnings
 import os
-import time
 import shutil
+import cache
+import medicao
+from fila import NA_FILA, fila_padrao
+# pandas, matplotlib, WeasyPrint (processamento) e Selenium (robo) só são
+# importados no primeiro uso: a página inicial abre sem carregar nenhum deles
 
 # ==============================================================================
 # CONFIGURAÇÕES INICIAIS
 # ==============================================================================
 st.set_page_config(page_title="Gerador de Relatórios", page_icon="📊", layout="wide")
 warnings.filterwarnings('ignore')
+medicao.configurar_log()
+fila = fila_padrao()
+INTERVALO_POLLING = 0.5
+
+
+def aquecer(t):
+    # O relatório roda nos processos da fila: são eles que precisam estar aquecidos
+    import processamento
+    fila.aquecer_processos(processamento.aquecer)
+
+
+@st.cache_resource
+def aquecimento():
+    """Uma vez por processo, em segundo plano: sobe os processos da fila, que importam o
+    pipeline e carregam fontes, estilo do Matplotlib e CSS do WeasyPrint antes do 1º relatório."""
+    return fila.submeter('aquecimento', aquecer, descricao='Aquecimento')
 
-# Tenta importar Selenium (Necessário para o Robô)
-try:
-    from selenium import webdriver
-    from selenium.webdriver.chrome.options import Options
-    from selenium.webdriver.common.by import By
-    from selenium.webdriver.chrome.service import Service
-    from selenium.webdriver.support.ui import WebDriverWait
-    from selenium.webdriver.support import expected_conditions as EC
-    HAS_SELENIUM = True
-except ImportError:
-    HAS_SELENIUM = False
 
 # --- CSS DO STREAMLIT ---
 st.markdown("""
@@ -40,136 +41,159 @@ st.markdown("""
 
 st.title("📊 Gerador de Relatório de Eventos")
 
+# ==============================================================================
+# TAREFAS EM SEGUNDO PLANO (rodam na fila; nada de st.* aqui dentro)
+# ==============================================================================
+def tarefa_download(t, jobs, usuario, senha, usa_http, lote):
+    """Baixa as edições na pasta da tarefa e põe cada export (bytes) no cache de exports;
+    a leitura fica para o processo do relatório. Devolve ({'subdominio/edicao': chave
+    do export}, mensagens de erro)."""
+    from cliente_http import baixar_lote_http
+    from robo import HAS_SELENIUM, baixar, baixar_lote
+    t.progresso(0.0, f"⏳ Baixando {len(jobs)} edição(ões)...")
+    avisar = lambda msg: t.progresso(mensagem=msg)
+    if usa_http:
+        gerador = baixar_lote_http(jobs, usuario, senha)
+    elif lote:
+        gerador = baixar_lote(jobs, usuario, senha, pasta_base=t.pasta)
+    else:
+        gerador = iter([baixar(*jobs[0], usuario, senha, status=avisar, pasta_base=t.pasta)])
+    resultados = []
+    for r in gerador:
+        if r.erro and usa_http and HAS_SELENIUM:
+            # Fallback: o robô Selenium tenta a edição que falhou via HTTP
+            avisar(f"↩️ HTTP falhou em {r.subdominio}/{r.edicao} ({r.erro}). Tentando pelo navegador...")
+            r = baixar(r.subdominio, r.edicao, usuario, senha, pasta_base=t.pasta)
+        resultados.append(r)
+        tempo = f" ({r.subdominio}/{r.edicao}: download em {r.espera:.1f}s)" if r.espera else ""
+        t.progresso(0.8 * len(resultados) / len(jobs), f"⬇️ {len(resultados)}/{len(jobs)} edições concluídas...{tempo}")
+
+    # Guardar: cada export vai para o cache de exports
+    exports, erros = {}, []
+    for r in resultados:
+        if r.erro:
+            erros.append(f"Erro no Robô ({r.subdominio}/{r.edicao}): {r.erro}")
+            continue
+        if r.dados is not None:
+            dados = r.dados
+        else:
+            with open(r.caminho, 'rb') as f: dados = f.read()
+            shutil.rmtree(os.path.dirname(r.caminho), ignore_errors=True)
+        chave = cache.hash_bytes(dados)
+        cache.CACHES['exports'].put(chave, (dados, os.path.basename(r.caminho)))
+        exports[f"{r.subdominio}/{r.edicao}"] = chave
+    return exports, erros
+
+
+def tarefa_relatorio(t, chave_bruto, upload, evento, ano, id_evento, streaming, perfilar):
+    """Leitura, limpeza, agregação e PDF num processo da fila (fora do GIL
+    desta thread). Devolve (pdf, resumo, avisos, texto do perfil)."""
+    from datetime import date
+    from limpeza import MAPEAMENTO_VERSAO
+    from processamento import relatorio_app
+    # Mesmo relatório já gerado hoje: sai do cache deste processo, sem despachar nada
+    chave = ('app', chave_bruto, evento, ano, id_evento, streaming, date.today(), MAPEAMENTO_VERSAO)
+    pronto = None if perfilar else cache.CACHES['pdf'].get(chave)
+    if pronto is not None:
+        return pronto
+    t.progresso(0.1, "⏳ Aguardando um processo livre...")
+    r = t.em_processo(relatorio_app, chave_bruto, upload, evento, ano, id_evento, streaming, perfilar,
+                      mensagem="⚙️ Lendo, limpando, agregando e gerando o PDF...")
+    t.progresso(0.95, "📄 PDF pronto.")
+    if not perfilar:
+        cache.CACHES['pdf'].put(chave, r)
+    return r
+
+
+@st.fragment(run_every=INTERVALO_POLLING)
+def acompanhar(id_tarefa):
+    """Progresso de uma tarefa da fila (só este trecho reexecuta); ao terminar, rerun completo."""
+    t = fila.tarefa(id_tarefa)
+    if t is None or t.terminada:
+        st.rerun()
+    texto = f"⏳ Na fila ({fila.posicao(t)} tarefa(s) na frente)..." if t.estado == NA_FILA else t.mensagem
+    st.progress(t.fracao, text=f"{texto} ({t.segundos:.0f}s)")
+
+
 # ==============================================================================
 # 1. INPUTS DE CONFIGURAÇÃO
 # ==============================================================================
 st.sidebar.header("Configuração do Relatório")
 con_event = st.sidebar.text_input("Nome do Evento (Título)", value="SOBED DAYS")
 con_year = st.sidebar.text_input("Ano", value="2026")
+incremental = st.sidebar.checkbox("Atualização incremental", value=True,
+                                  help="Compara o export com o anterior do mesmo evento (edição do robô ou identificador do upload) e só processa as inscrições que mudaram.")
+
+streaming = st.sidebar.checkbox("Modo streaming (exports muito grandes)",
+                                help="Lê o export em blocos e guarda só as contagens: memória limitada ao bloco. Ignora a atualização incremental.")
+
+perfilar = st.sidebar.checkbox("Perfilar processamento (cProfile)", help="Mostra as funções mais custosas desta execução.")
 
 modo_entrada = st.sidebar.radio("Como obter os dados?", ("Upload Manual", "Robô Automático"))
 
-df_final = None
+chave_bruto = None
+upload = None  # (bytes, nome) do export: upload manual ou download do robô
+id_evento = None  # identifica o snapshot do incremental (o título é texto livre)
+tarefas_exibidas = []
 
 # ==============================================================================
 # 2. MODO ROBÔ (DOWNLOAD AUTOMÁTICO)
 # ==============================================================================
 if modo_entrada == "Robô Automático":
-    if not HAS_SELENIUM:
-        st.error("⚠️ As bibliotecas do Selenium não estão instaladas. Verifique o requirements.txt.")
-    else:
-        st.info("🤖 **Configuração de Acesso**")
-        c1, c2 = st.columns(2)
-        with c1:
-            subdominio = st.text_input("Subdomínio (ex: ccm)", value="ccm")
-            usuario = st.text_input("Usuário")
-        with c2:
-            edicao = st.text_input("Edição na URL (ex: dic2025)", value="dic2025")
-            senha = st.text_input("Senha", type="password")
-            
-        if st.button("🚀 INICIAR ROBÔ"):
-            status = st.empty()
-            try:
-                status.info("⏳ Iniciando navegador no servidor...")
-                
-                # Configuração Selenium para Linux/Streamlit Cloud
-                chrome_options = Options()
-                chrome_options.add_argument("--headless")
-                chrome_options.add_argument("--no-sandbox")
-                chrome_options.add_argument("--disable-dev-shm-usage")
-                chrome_options.add_argument("--disable-gpu")
-                chrome_options.add_argument("--window-size=1920,1080")
-                chrome_options.binary_location = "/usr/bin/chromium"
-                
-                download_dir = os.getcwd()
-                prefs = {"download.default_directory": download_dir}
-                chrome_options.add_experimental_option("prefs", prefs)
-                
-                service = Service("/usr/bin/chromedriver")
-                driver = webdriver.Chrome(service=service, options=chrome_options)
-                wait = WebDriverWait(driver, 20)
-
-                # 1. Login
-                status.info("🔑 Acessando sistema...")
-                driver.get(f"https://{subdominio}.iweventos.com.br/sistema/not/acesso/login")
-                
-                # Busca inteligente de campos
-                def find_any(locators):
-                    for by, val in locators:
-                        try: return wait.until(EC.presence_of_element_located((by, val)))
-                        except: continue
-                    return None
-
-                user_field = find_any([(By.NAME, "login"), (By.ID, "usuario"), (By.ID, "login")])
-                pass_field = find_any([(By.NAME, "senha"), (By.ID, "senha")])
-                
-                if user_field and pass_field:
-                    user_field.send_keys(usuario)
-                    pass_field.send_keys(senha)
-                    try: pass_field.submit()
-                    except: 
-                        btn = find_any([(By.CSS_SELECTOR, "button[type='submit']"), (By.ID, "btnEntrar")])
-                        if btn: btn.click()
-                else:
-                    raise Exception("Campos de login não encontrados.")
-
-                time.sleep(3)
-                
-                # 2. Relatório
-                status.info(f"📍 Acessando edição {edicao}...")
-                driver.get(f"https://{subdominio}.iweventos.com.br/sistema/{edicao}/relinscricoesexcel/inscricoes")
-                
-                if "login" in driver.current_url:
-                    raise Exception("Login falhou. Verifique usuário e senha.")
+    from robo import HAS_SELENIUM, credencial, ler_jobs
+    st.info("🤖 **Configuração de Acesso**")
+    c1, c2 = st.columns(2)
+    with c1:
+        subdominio = st.text_input("Subdomínio (ex: ccm)", value="ccm")
+        usuario = st.text_input("Usuário")
+    with c2:
+        edicao = st.text_input("Edição na URL (ex: dic2025)", value="dic2025")
+        senha = st.text_input("Senha", type="password")
+        
+    motor = st.radio("Motor de download", ("HTTP direto (rápido)", "Navegador (Selenium)"), horizontal=True)
+    usa_http = motor.startswith("HTTP")
+    lote = st.checkbox("Várias edições em paralelo (lote)")
+    if lote:
+        texto_jobs = st.text_area("Edições (uma por linha: subdominio/edicao)", value=f"{subdominio}/{edicao}")
 
-                # 3. Checkboxes (Via JS para garantir)
-                status.info("☑️ Selecionando dados...")
-                driver.execute_script("""
-                    var classes = ['agrupador_inscricao', 'agrupador_dados_pessoais', 'agrupador_dados_contato', 
-                                   'agrupador_dados_complementares', 'agrupador_dados_correspondencia', 
-                                   'agrupador_transporte_ida', 'agrupador_transporte_volta', 
-                                   'agrupador_hospedagem', 'agrupador_cobranca'];
-                    classes.forEach(cls => {
-                        var el = document.getElementsByClassName(cls)[0];
-                        if(el) el.click();
-                    });
-                """)
-                
-                # 4. Download
-                status.info("⬇️ Baixando Excel...")
-                driver.execute_script("document.getElementById('btGerar').click();")
-                
-                # Espera arquivo
-                arquivo_baixado = None
-                for i in range(60):
-                    time.sleep(1)
-                    files = [f for f in os.listdir(download_dir) if f.endswith(('.xlsx', '.xls', '.csv'))]
-                    if files:
-                        # Ordena pelo mais recente
-                        files.sort(key=lambda x: os.path.getmtime(os.path.join(download_dir, x)), reverse=True)
-                        cand = os.path.join(download_dir, files[0])
-                        if not cand.endswith('.crdownload'):
-                            arquivo_baixado = cand
-                            break
-                
-                driver.quit()
-                
-                if arquivo_baixado:
-                    status.success("✅ Arquivo baixado!")
-                    # Carregar
-                    if arquivo_baixado.endswith('.csv'):
-                        try: df_final = pd.read_csv(arquivo_baixado, sep=',')
-                        except: df_final = pd.read_csv(arquivo_baixado, sep=';', engine='python')
-                    else:
-                        df_final = pd.read_excel(arquivo_baixado)
-                    try: os.remove(arquivo_baixado)
-                    except: pass
-                else:
-                    st.error("Erro: Download não finalizado.")
-                    
-            except Exception as e:
-                st.error(f"Erro no Robô: {e}")
-                if 'driver' in locals(): driver.quit()
+    if not usa_http and not HAS_SELENIUM:
+        st.error("⚠️ As bibliotecas do Selenium não estão instaladas. Verifique o requirements.txt.")
+    elif st.button("🚀 INICIAR ROBÔ"):
+        jobs = ler_jobs(texto_jobs, subdominio) if lote else [(subdominio.strip(), edicao.strip())]
+        if not jobs or not all(s and e for s, e in jobs):
+            st.error("⚠️ Informe ao menos uma edição (subdominio/edicao).")
+        else:
+            # Mesmas edições com a mesma credencial já baixando: acompanha aquele download
+            t = fila.submeter(('download', credencial(usuario, senha), tuple(jobs), usa_http), tarefa_download,
+                              jobs, usuario, senha, usa_http, lote, descricao=f"Download {len(jobs)} edição(ões)")
+            st.session_state['tarefa_download'] = t.id
+
+    t = fila.tarefa(st.session_state.get('tarefa_download'))
+    if t is not None:
+        tarefas_exibidas.append(t)
+        if not t.terminada:
+            acompanhar(t.id)
+        else:
+            del st.session_state['tarefa_download']
+            if t.erro:
+                st.error(f"Erro no Robô: {t.erro}")
+            else:
+                exports, erros = t.resultado
+                for erro in erros:
+                    st.error(erro)
+                if exports:
+                    st.success(f"✅ {len(exports)} arquivo(s) baixado(s)!")
+                    st.session_state['robo_exports'] = exports
+
+    # Reruns (ex.: edição do título) reaproveitam os últimos downloads
+    exports = st.session_state.get('robo_exports', {})
+    if exports:
+        escolha = st.selectbox("Edição para o relatório", list(exports)) if len(exports) > 1 else next(iter(exports))
+        chave_bruto = exports[escolha]
+        id_evento = escolha
+        upload = cache.CACHES['exports'].get(chave_bruto)
+        if upload is None:
+            st.warning("Export descartado do cache. Rode o robô novamente.")
 
 # ==============================================================================
 # 3. MODO UPLOAD MANUAL
@@ -177,255 +201,83 @@ if modo_entrada == "Robô Automático":
 else:
     uploaded_file = st.file_uploader("Upload Excel/CSV", type=['xlsx', 'csv'])
     if uploaded_file:
-        if uploaded_file.name.endswith('.csv'):
-            try: df_final = pd.read_csv(uploaded_file, sep=',')
-            except: df_final = pd.read_csv(uploaded_file, sep=';')
-        else:
-            df_final = pd.read_excel(uploaded_file)
+        # A leitura roda na tarefa; aqui só o hash, que identifica o export
+        # (calculado uma vez por arquivo enviado, não a cada rerun)
+        upload = (uploaded_file.getvalue(), uploaded_file.name)
+        id_arquivo, chave_bruto = st.session_state.get('hash_upload', (None, None))
+        if id_arquivo != uploaded_file.file_id:
+            chave_bruto = cache.hash_bytes(upload[0])
+            st.session_state['hash_upload'] = (uploaded_file.file_id, chave_bruto)
+        if incremental and not streaming:
+            id_evento = st.text_input("Identificador do evento (ex.: ccm/dic2025)",
+                                      help="Estável entre exports do mesmo evento: liga a atualização incremental.").strip()
+            if not id_evento:
+                st.caption("Sem identificador: o relatório é calculado do export inteiro.")
 
 # ==============================================================================
 # 4. PROCESSAMENTO E PDF (Lógica "Colab" Restaurada)
 # ==============================================================================
-if df_final is not None:
+if upload is not None:
     st.divider()
     st.write("### ⚙️ Processando e Gerando PDF...")
-    
-    try:
-        # --- LIMPEZA DE DADOS (Restaurada do Colab) ---
-        df = df_final
-        
-        # Mapeamento Rígido (Índices que funcionavam no Colab)
-        try:
-            # 1=Nome, 2=Categoria, 4=Pgto, 5=DtPgto, 9=Situação, 13=DtInscricao, 21=Nasc, 52=UF, 53=País
-            df_clean = df.iloc[:, [1, 2, 4, 5, 9, 13, 21, 52, 53]].copy()
-            df_clean.columns = ['Nome', 'Categoria', 'Pgto', 'DataPagamento', 'Situacao', 'DataInscricao', 'Nasc', 'UF', 'Pais']
-        except:
-            st.warning("Tentando mapeamento alternativo de colunas...")
-            # Fallback se as colunas mudaram
-            df_clean = df.copy() # Lógica simplificada de fallback
-        
-        df_clean = df_clean.dropna(subset=['Nome'])
-        
-        # Funções de Tratamento
-        def normalizar(txt):
-            if not isinstance(txt, str): return ""
-            return unicodedata.normalize('NFKD', txt).encode('ASCII', 'ignore').decode('ASCII').upper().strip()
-
-        def calc_idade(d):
-            try:
-                dt = d if isinstance(d, datetime) else datetime.strptime(str(d)[:10], "%d/%m/%Y")
-                return (datetime.now() - dt).days // 365
-            except: return -1
-
-        def classificar(row):
-            pg = str(row['Pgto']).lower()
-            st = str(row['Situacao']).lower()
-            if 'cortesia' in pg: return 'Cortesia'
-            if 'pago' in st: return 'Pago'
-            return 'Aberto' # Unificado para "Aberto"
-
-        # Aplicações
-        df_clean['UF_Norm'] = df_clean['UF'].apply(normalizar)
-        df_clean['Pais'] = df_clean['Pais'].apply(normalizar)
-        df_clean['Categoria'] = df_clean['Categoria'].apply(lambda x: str(x).strip().replace("Equipe Multidisciplinar", "Eq. Multi"))
-        
-        df_clean['IdadeNum'] = df_clean['Nasc'].apply(calc_idade)
-        def fx_etaria(i):
-            if i < 0: return "N/I"
-            if i < 25: return "< 25 Anos"
-            if i <= 35: return "25 - 35 Anos"
-            if i <= 45: return "36 - 45 Anos"
-            if i <= 55: return "46 - 55 Anos"
-            return "> 55 Anos"
-        df_clean['FaixaEtaria'] = df_clean['IdadeNum'].apply(fx_etaria)
-        
-        # Classificação Crucial (Corrige o erro do gráfico de evolução)
-        df_clean['Status'] = df_clean.apply(classificar, axis=1)
-
-        # Datas
-        df_clean['DataInscricao'] = pd.to_datetime(df_clean['DataInscricao'], dayfirst=True, errors='coerce')
-        df_clean['DataPagamento'] = pd.to_datetime(df_clean['DataPagamento'], dayfirst=True, errors='coerce')
-        
-        def get_dt_graf(row):
-            # Se pago, usa data pagamento. Se não, usa inscrição.
-            if row['Status'] == 'Pago' and pd.notnull(row['DataPagamento']): return row['DataPagamento']
-            return row['DataInscricao']
-        
-        df_clean['DataGrafico'] = df_clean.apply(get_dt_graf, axis=1)
-        df_grafico = df_clean.dropna(subset=['DataGrafico'])
-
-        # Regiões (Mapeamento Robusto)
-        reg_map = {
-            "SP":"Sudeste","SAO PAULO":"Sudeste", "RJ":"Sudeste","RIO DE JANEIRO":"Sudeste",
-            "MG":"Sudeste","MINAS GERAIS":"Sudeste","ES":"Sudeste",
-            "PR":"Sul","PARANA":"Sul","SC":"Sul","SANTA CATARINA":"Sul","RS":"Sul","RIO GRANDE DO SUL":"Sul",
-            "BA":"Nordeste","BAHIA":"Nordeste","PE":"Nordeste","CE":"Nordeste",
-            "DF":"Centro-Oeste","GO":"Centro-Oeste","AM":"Norte","PA":"Norte"
-        }
-        def get_regiao(uf):
-            if not uf: return "Outros"
-            # Tenta direto ou pelo UF normalizado
-            return reg_map.get(uf, reg_map.get(uf.upper(), "Outros"))
-            
-        df_clean['Regiao'] = df_clean['UF_Norm'].apply(get_regiao)
-
-        # --- GERAÇÃO DOS GRÁFICOS (Matplotlib) ---
-        def to_b64(fig):
-            b = BytesIO(); fig.savefig(b, format='png', dpi=120, transparent=True); plt.close(fig)
-            return base64.b64encode(b.getvalue()).decode('utf-8')
-
-        # 1. Pizza (Região)
-        f1, a1 = plt.figure(figsize=(7,5)), plt.gca(); plt.style.use('ggplot')
-        def agrupar_reg(s):
-            c = s.value_counts(); p = c/len(s); m = c[p>=0.1]; mn = c[p<0.1].sum()
-            r = m.copy(); 
-            if mn>0: r['Outros'] = r.get('Outros',0)+mn
-            return r
-        d_reg = agrupar_reg(df_clean['Regiao'])
-        wedges, texts, autotexts = a1.pie(d_reg, labels=d_reg.index, autopct='%1.1f%%', startangle=90)
-        plt.setp(autotexts, size=10, weight="bold", color="white")
-        img_reg = to_b64(f1)
-
-        # 2. Barras (Idade)
-        f2, a2 = plt.figure(figsize=(7,5)), plt.gca()
-        d_id = df_clean['FaixaEtaria'].value_counts().sort_index()
-        d_id.plot(kind='bar', color='#3498db', ax=a2); plt.xticks(rotation=0)
-        a2.bar_label(a2.containers[0], padding=3)
-        plt.ylim(top=max(d_id.values)*1.2 if len(d_id)>0 else 1)
-        img_id = to_b64(f2)
-
-        # 3. Evolução (CORRIGIDO: Status unificados)
-        df_evo = df_grafico.set_index('DataGrafico').groupby([pd.Grouper(freq='W'), 'Status']).size().unstack(fill_value=0)
-        f3, a3 = plt.figure(figsize=(12,5)), plt.gca()
-        
-        # Garante que as 3 colunas existem para não dar erro
-        for c in ['Pago', 'Cortesia', 'Aberto']:
-            if c not in df_evo.columns: df_evo[c] = 0
-            
-        a3.plot(df_evo.index, df_evo['Pago'], marker='o', color='#27ae60', label='Pagos')
-        a3.plot(df_evo.index, df_evo['Cortesia'], marker='o', color='#f39c12', label='Cortesia')
-        a3.plot(df_evo.index, df_evo['Aberto'], marker='o', color='#c0392b', label='Aberto')
 
-        a3.legend(); a3.grid(True, linestyle='--', alpha=0.5)
-        
-        # Eixo X Otimizado
-        dates = df_evo.index; labels = []; pm = None; py = None; a3.set_xticks(dates)
-        for d in dates:
-            l = f"{d.day}"; 
-            if pm != d.month: l += f"\n{d.strftime('%b')}"; a3.axvline(d, c='#ccc', ls='--')
-            if py != d.year: l += f"\n{d.year}"; a3.axvline(d, c='#666', ls='-')
-            labels.append(l); pm=d.month; py=d.year
-        a3.set_xticklabels(labels, fontsize=8); img_evo = to_b64(f3)
-
-        # --- DADOS PARA TABELAS ---
-        def tab(df, col):
-            r = df.groupby([col, 'Status']).size().unstack(fill_value=0)
-            for c in ['Pago','Cortesia','Aberto']: 
-                if c not in r.columns: r[c] = 0
-            r['Total'] = r['Pago']+r['Cortesia']+r['Aberto']
-            return r.sort_values('Total', ascending=False)
-
-        tb_cat = tab(df_clean, 'Categoria')
-        tb_pais = tab(df_clean, 'Pais')
-        tb_uf = tab(df_clean[df_clean['Pais']=='BRASIL'], 'UF')
-
-        tot=len(df_clean); pg=len(df_clean[df_clean['Status']=='Pago']); cr=len(df_clean[df_clean['Status']=='Cortesia']); ab=len(df_clean[df_clean['Status']=='Aberto'])
-        d_str = (datetime.utcnow()-timedelta(hours=3)).strftime('%d/%m/%Y %H:%M')
-
-        # --- GERAÇÃO HTML/PDF (VISUAL PREMIUM RESTAURADO) ---
-        
-        def render(df, title):
-            h = '<table class="dt"><thead><tr><th>'+title+'</th><th class="n">Total</th><th class="n">Pagos</th><th class="n">Cort.</th><th class="n">Aberto</th></tr></thead><tbody>'
-            for i,r in df.iterrows():
-                nm = str(i)[:40] if str(i)!='nan' else "N/I"
-                h += f'<tr><td>{nm}</td><td class="n b">{r["Total"]}</td><td class="n g">{r["Pago"]}</td><td class="n o">{r["Cortesia"]}</td><td class="n r">{r["Aberto"]}</td></tr>'
-            return h+'</tbody></table>'
-
-        # CSS Completo (Restaurado do Colab Original)
-        css = """
-        @page { size: A4; margin: 1cm; }
-        body { font-family: Helvetica, sans-serif; margin: 0; color: #333; background: #fff; }
-        .head { padding: 15px 0; border-bottom: 2px solid #eee; margin-bottom: 20px; }
-        .tit { font-size: 24px; font-weight: 700; color: #333; }
-        .meta { font-size: 11px; color: #777; margin-top: 5px; }
-        
-        .kpi-row { display: flex; justify-content: space-between; gap: 10px; margin-bottom: 25px; }
-        .kpi { width: 23%; padding: 15px 5px; border-radius: 8px; color: white; text-align: center; }
-        .kl { font-size: 10px; font-weight: bold; text-transform: uppercase; margin-bottom: 5px; opacity: 0.9; }
-        .kv { font-size: 32px; font-weight: 800; }
-        
-        .card { border: 1px solid #e0e0e0; border-radius: 8px; margin-bottom: 20px; page-break-inside: avoid; background: #fff; }
-        .ch { padding: 12px 15px; border-bottom: 1px solid #eee; background: #f8f9fa; }
-        .ch h3 { margin: 0; font-size: 14px; color: #444; text-transform: uppercase; font-weight: 700; }
-        .cb { padding: 15px; text-align: center; }
-        
-        .row { display: flex; gap: 15px; margin-bottom: 10px; }
-        .col { width: 48%; }
-        .img { width: 100%; max-height: 280px; object-fit: contain; }
-        
-        .dt { width: 100%; border-collapse: collapse; font-size: 11px; }
-        .dt th { background: #f8f9fa; padding: 8px; text-align: left; border-bottom: 2px solid #ddd; color: #555; }
-        .dt td { padding: 6px 8px; border-bottom: 1px solid #eee; color: #444; }
-        .dt tr:nth-child(even) { background: #fafafa; }
-        .n { text-align: right; width: 45px; }
-        .b { font-weight: bold; background: #f0f0f0; }
-        .g { color: #27ae60; font-weight: bold; }
-        .o { color: #d35400; font-weight: bold; }
-        .r { color: #c0392b; font-weight: bold; }
-        """
-        
-        html = f"""<!DOCTYPE html><html><head><style>{css}</style></head><body>
-        <div class="head">
-            <div class="tit">Relatório - {con_event} {con_year}</div>
-            <div class="meta">Gerado em: {d_str} (Horário de Brasília)</div>
-        </div>
-
-        <div class="kpi-row">
-            <div class="kpi" style="background:#3498db"><div class="kl">Total Inscritos</div><div class="kv">{tot}</div></div>
-            <div class="kpi" style="background:#27ae60"><div class="kl">Pagos Confirmados</div><div class="kv">{pg}</div></div>
-            <div class="kpi" style="background:#f39c12"><div class="kl">Cortesias</div><div class="kv">{cr}</div></div>
-            <div class="kpi" style="background:#c0392b"><div class="kl">Em Aberto</div><div class="kv">{ab}</div></div>
-        </div>
-
-        <div class="card">
-            <div class="ch"><h3>Evolução Semanal das Inscrições</h3></div>
-            <div class="cb"><img src="data:image/png;base64,{img_evo}" style="width:100%"></div>
-        </div>
-
-        <div class="row">
-            <div class="col card">
-                <div class="ch"><h3>Distribuição por Região</h3></div>
-                <div class="cb"><img src="data:image/png;base64,{img_reg}" class="img"></div>
-            </div>
-            <div class="col card">
-                <div class="ch"><h3>Perfil Etário</h3></div>
-                <div class="cb"><img src="data:image/png;base64,{img_id}" class="img"></div>
-            </div>
-        </div>
-
-        <div class="card">
-            <div class="ch"><h3>Detalhamento por Categoria</h3></div>
-            <div class="cb" style="text-align:left;padding:0">{render(tb_cat, 'Categoria')}</div>
-        </div>
-
-        <div class="row">
-            <div class="col card">
-                <div class="ch"><h3>Detalhamento por País</h3></div>
-                <div class="cb" style="text-align:left;padding:0">{render(tb_pais, 'País')}</div>
-            </div>
-            <div class="col card">
-                <div class="ch"><h3>Detalhamento por Estado (Brasil)</h3></div>
-                <div class="cb" style="text-align:left;padding:0">{render(tb_uf, 'Estado')}</div>
-            </div>
-        </div>
-        </body></html>"""
-
-        pdf_io = BytesIO()
-        HTML(string=html).write_pdf(pdf_io)
-        
+    id_evento = id_evento if incremental and not streaming else None
+    chave = ('relatorio', chave_bruto, con_event, con_year, id_evento, streaming, perfilar)
+    anterior = st.session_state.get('tarefa_relatorio')
+    t = fila.tarefa(anterior[1]) if anterior and anterior[0] == chave else None
+    if t is None:
+        # Outra sessão gerando o mesmo relatório: reaproveita a tarefa dela
+        t = fila.submeter(chave, tarefa_relatorio, chave_bruto, upload, con_event, con_year,
+                          id_evento, streaming, perfilar, descricao=f"Relatório {con_event} {con_year}")
+        st.session_state['tarefa_relatorio'] = (chave, t.id)
+    tarefas_exibidas.append(t)
+
+    if not t.terminada:
+        acompanhar(t.id)
+    elif t.erro:
+        # Sem a tarefa na sessão, o próximo rerun submete o relatório de novo
+        del st.session_state['tarefa_relatorio']
+        falha = next((r['etapa'] for r in reversed(t.medicao.etapas) if 'erro' in r), None)
+        st.error(f"Erro ao processar{f' (etapa {falha})' if falha else ''}: {t.erro}")
+        st.button("🔁 Tentar novamente")
+    else:
+        pdf, resumo, avisos, perfil = t.resultado
+        for aviso in avisos:
+            st.warning(aviso)
+        if resumo:
+            st.caption("Incremental: {novos} novas, {alterados} alteradas, {removidos} removidas, "
+                       "{iguais} sem mudança.".format(**resumo))
         st.balloons()
         st.success(f"✅ Relatório do evento **{con_event}** gerado com sucesso!")
-        st.download_button("⬇️ BAIXAR PDF FINAL", data=pdf_io.getvalue(), file_name=f"Relatorio_{con_event.replace(' ','_')}_{con_year}.pdf", mime="application/pdf")
+        from processamento import nome_pdf
+        st.download_button("⬇️ BAIXAR PDF FINAL", data=pdf, file_name=nome_pdf(con_event, con_year), mime="application/pdf")
+        if perfil is not None:
+            with st.expander("Perfil (cProfile, tempo acumulado)"):
+                st.code(perfil)
+
+# --- ETAPAS DAS TAREFAS EXIBIDAS (o processamento todo roda na fila) ---
+with st.sidebar.expander("Etapas (tempo, linhas, memória)"):
+    etapas = [e for t in tarefas_exibidas for e in t.medicao.etapas]
+    if etapas:
+        import pandas as pd
+        tabela = pd.DataFrame(etapas)
+        # Pico medido junto com outras tarefas: só um limite superior (ver medicao.py)
+        st.dataframe(tabela[['etapa', 'pai', 'segundos', 'linhas', 'pico_mb']
+                            + (['pico_compartilhado'] if 'pico_compartilhado' in tabela else [])])
+    elif any(not t.terminada for t in tarefas_exibidas):
+        st.caption("Nenhuma etapa concluída ainda.")
+    elif tarefas_exibidas:
+        st.caption("As tarefas exibidas usaram só resultados do cache.")
+    else:
+        st.caption("Nenhuma tarefa nesta página.")
+
+# --- ESTATÍSTICAS DO CACHE ---
+with st.sidebar.expander("Cache (hits / misses)"):
+    # Caches vazios: nada processado ainda (e o pandas nem foi importado)
+    if any(c.hits or c.misses for c in cache.CACHES.values()):
+        st.dataframe(cache.estatisticas())
+    else:
+        st.caption("Nenhum acesso ao cache neste processo.")
 
-    except Exception as e:
-        st.error(f"Erro ao processar: {e}")
+# Por último: a página já foi desenhada quando o aquecimento começa
+aquecimento()
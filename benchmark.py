@@ -0,0 +1,354 @@
+"""Benchmark do pipeline (seção 4 do app) com exports sintéticos do iweventos.
+
+    python benchmark.py                                  # 1k a 1M linhas, csv e xlsx
+    python benchmark.py --linhas 1000 10000 --formatos csv
+    python benchmark.py --salvar-baseline                # grava a baseline desta máquina
+    python benchmark.py --tolerancia 0.2                 # sai com 1 se alguma etapa piorar >20%
+    python benchmark.py --concorrentes 1 2 4 --linhas 50000  # latência de relatórios simultâneos na fila
+    python benchmark.py --incremental --linhas 200000   # cálculo completo x snapshot com ~600 mudanças
+
+Cada etapa (leitura, limpeza, agregação, cada gráfico, HTML, layout e escrita
+do PDF) é medida pelo módulo `medicao`, com caches zerados a cada repetição;
+vale o menor tempo das repetições. A baseline guarda tempos, pico de memória e
+os KPIs de cada conjunto: KPI diferente é regressão de resultado, não de
+desempenho. Os exports gerados ficam em .benchmark/ e são reaproveitados.
+
+Com --incremental, compara o cálculo completo (limpeza + agregação) com a
+atualização do snapshot (snapshot.py) para um export em que ~600 inscrições
+foram incluídas, alteradas ou removidas desde o anterior.
+
+Com --concorrentes, mede a latência de N relatórios distintos submetidos
+juntos à fila do app (fila.Fila), para cada N: o relatório roda nos
+processos da fila, então até um relatório por núcleo a latência fica perto
+da de um só; além disso, os excedentes esperam um processo livre.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+
+import cache
+import medicao
+import snapshot
+from agregacao import agregar, montar
+from fila import PROCESSOS, Fila
+from ingestao import ler_export
+from limpeza import INDICES, limpar, mapear_colunas
+from processamento import agregados, aquecer, pdf_relatorio, relatorio_app
+
+PASTA = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.benchmark')
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+ESCALAS = [1_000, 10_000, 100_000, 1_000_000]
+FORMATOS = ['csv', 'xlsx']
+MIN_SEGUNDOS = 0.05  # diferença absoluta abaixo disso é ruído
+
+UFS = ['AC', 'AL', 'AP', 'AM', 'BA', 'CE', 'DF', 'ES', 'GO', 'MA', 'MT', 'MS', 'MG', 'PA',
+       'PB', 'PR', 'PE', 'PI', 'RJ', 'RN', 'RS', 'RO', 'RR', 'SC', 'SP', 'SE', 'TO']
+# Peso aproximado das inscrições por UF (eventos médicos concentrados no Sudeste)
+PESO_UF = np.array([1, 2, 1, 2, 6, 4, 4, 2, 3, 2, 2, 2, 10, 2, 2, 6, 5, 1, 10, 2, 6, 1, 1, 4, 25, 1, 1], float)
+UF_SUJAS = ['São Paulo', 'sp', ' RJ ', 'Rio de Janeiro', 'Minas Gerais', 'Paraná', 'PARANA', 'Bahia',
+            'pernambuco', 'Distrito Federal', 'XX', '-', '']
+PAISES = ['Brasil', 'BRASIL', 'brasil ', 'Portugal', 'Argentina', 'Estados Unidos', 'Colômbia', 'Paraguai']
+PESO_PAIS = np.array([80, 6, 2, 4, 3, 2, 1.5, 1.5])
+CATEGORIAS = ['Médico', 'Médico Sócio', 'Residente', 'Equipe Multidisciplinar', 'Estudante', ' Médico ', 'Acadêmico']
+PAGAMENTOS = ['Cartão de Crédito', 'Boleto', 'Pix', 'Cortesia', 'CORTESIA PALESTRANTE', 'Transferência']
+SITUACOES = ['Pago', 'Aguardando pagamento', 'Cancelado', 'Não pago', 'PAGO']
+NOMES = ['Ana', 'Bruno', 'Carla', 'Daniel', 'Eduarda', 'Felipe', 'Gabriela', 'Henrique', 'Isabela', 'João']
+SOBRENOMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Lima', 'Pereira', 'Costa', 'Almeida', 'Ribeiro', 'Gomes']
+
+
+def _escolher(rnd, valores, n, pesos=None):
+    p = None if pesos is None else pesos / pesos.sum()
+    return np.asarray(valores, dtype=object)[rnd.choice(len(valores), n, p=p)]
+
+
+def _datas(dias, fmt):
+    """Formata só os dias distintos (centenas), não as n linhas."""
+    unicos, inv = np.unique(dias, return_inverse=True)
+    return np.asarray(pd.to_datetime(unicos, unit='D').strftime(fmt), dtype=object)[inv]
+
+
+def gerar_export(linhas, semente=0):
+    """Export sintético no layout de 54 colunas (limpeza.INDICES), com linhas sujas."""
+    rnd = np.random.default_rng(semente)
+    n = linhas
+    cols = {i: np.full(n, None, dtype=object) for i in range(54)}
+
+    cols[0] = np.char.add('', (100000 + np.arange(n)).astype(str)).astype(object)
+    nomes = _escolher(rnd, NOMES, n) + ' ' + _escolher(rnd, SOBRENOMES, n)
+    nomes[rnd.random(n) < 0.01] = None  # linhas sem nome são descartadas pela limpeza
+    cols[1] = nomes
+    cols[2] = _escolher(rnd, CATEGORIAS, n)
+    cols[2][rnd.random(n) < 0.005] = 123  # sujeira de tipo: categoria numérica
+    cols[4] = _escolher(rnd, PAGAMENTOS, n)
+    cols[9] = _escolher(rnd, SITUACOES, n)
+
+    inicio = (pd.Timestamp('2025-01-01') - pd.Timestamp('1970-01-01')).days
+    insc = inicio + rnd.integers(0, 300, n)
+    hora = np.char.add(np.char.zfill(rnd.integers(0, 24, n).astype(str), 2), ':')
+    hora = np.char.add(hora, np.char.zfill(rnd.integers(0, 60, n).astype(str), 2)).astype(object)
+    cols[13] = _datas(insc, '%d/%m/%Y') + ' ' + hora
+    pgto = _datas(insc + rnd.integers(0, 15, n), '%d/%m/%Y')
+    pgto[rnd.random(n) < 0.35] = None
+    cols[5] = pgto
+
+    nasc = _datas((pd.Timestamp('1945-01-01') - pd.Timestamp('1970-01-01')).days + rnd.integers(0, 22000, n), '%d/%m/%Y')
+    sujo = rnd.random(n)
+    nasc[sujo < 0.03] = None
+    nasc[(sujo >= 0.03) & (sujo < 0.05)] = '00/00/0000'
+    nasc[(sujo >= 0.05) & (sujo < 0.06)] = '31/02/1980'
+    cols[21] = nasc
+
+    pais = _escolher(rnd, PAISES, n, PESO_PAIS)
+    pais[rnd.random(n) < 0.02] = None
+    cols[53] = pais
+    uf = _escolher(rnd, UFS, n, PESO_UF)
+    sujo = rnd.random(n) < 0.08
+    uf[sujo] = _escolher(rnd, UF_SUJAS, int(sujo.sum()))
+    estrangeiro = ~np.isin(pais, ['Brasil', 'BRASIL', 'brasil '])
+    uf[estrangeiro & (rnd.random(n) < 0.8)] = None
+    cols[52] = uf
+
+    # Demais colunas: contato/endereço, para o arquivo ter o peso de um export real
+    cols[3] = _escolher(rnd, ['Sim', 'Não'], n)
+    cols[6] = np.char.add('R$ ', rnd.integers(300, 2500, n).astype(str)).astype(object)
+    cols[14] = np.char.add('inscrito', np.arange(n).astype(str)).astype(object) + '@exemplo.com.br'
+    cols[15] = np.char.add('(11) 9', rnd.integers(1000, 9999, n).astype(str)).astype(object) + '-0000'
+    cols[22] = _escolher(rnd, ['Feminino', 'Masculino', 'Não informado'], n)
+    cols[48] = _escolher(rnd, ['Rua das Flores', 'Av. Brasil', 'Rua XV de Novembro', 'Av. Paulista'], n)
+    cols[50] = _escolher(rnd, ['São Paulo', 'Rio de Janeiro', 'Belo Horizonte', 'Curitiba', 'Salvador', 'Recife'], n)
+
+    return pd.DataFrame({f'Coluna {i}': cols[i] for i in range(54)})
+
+
+def salvar_xlsx(df, caminho, bloco=50_000):
+    """xlsx mínimo (strings inline) escrito em streaming; o openpyxl levaria minutos em 1M linhas."""
+    with zipfile.ZipFile(caminho, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as z:
+        z.writestr('[Content_Types].xml',
+                   '<?xml version="1.0" encoding="UTF-8"?><Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                   '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                   '<Default Extension="xml" ContentType="application/xml"/>'
+                   '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+                   '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                   '</Types>')
+        z.writestr('_rels/.rels',
+                   '<?xml version="1.0" encoding="UTF-8"?><Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                   '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+                   '</Relationships>')
+        z.writestr('xl/workbook.xml',
+                   '<?xml version="1.0" encoding="UTF-8"?><workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+                   'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+                   '<sheets><sheet name="Inscricoes" sheetId="1" r:id="rId1"/></sheets></workbook>')
+        z.writestr('xl/_rels/workbook.xml.rels',
+                   '<?xml version="1.0" encoding="UTF-8"?><Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                   '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+                   '</Relationships>')
+        with z.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as f:
+            f.write(b'<?xml version="1.0" encoding="UTF-8"?><worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+            cab = ''.join(f'<c t="inlineStr"><is><t>{escape(str(c))}</t></is></c>' for c in df.columns)
+            f.write(f'<row>{cab}</row>'.encode('utf-8'))
+            for ini in range(0, len(df), bloco):
+                parte = df.iloc[ini:ini + bloco]
+                linha = np.full(len(parte), '<row>', dtype=object)
+                for c in parte.columns:
+                    v = parte[c]
+                    texto = v.fillna('').astype(str).str.replace('&', '&amp;').str.replace('<', '&lt;').to_numpy(dtype=object)
+                    linha = linha + np.where(v.isna().to_numpy(), '<c/>', '<c t="inlineStr"><is><t>' + texto + '</t></is></c>')
+                f.write(''.join(linha + '</row>').encode('utf-8'))
+            f.write(b'</sheetData></worksheet>')
+
+
+def export(linhas, formato, pasta=PASTA):
+    """Caminho do export sintético (gerado na primeira vez)."""
+    os.makedirs(pasta, exist_ok=True)
+    caminho = os.path.join(pasta, f'export_{linhas}.{formato}')
+    if not os.path.exists(caminho):
+        df = gerar_export(linhas)
+        tmp = caminho + '.tmp'
+        if formato == 'csv':
+            df.to_csv(tmp, index=False)
+        else:
+            salvar_xlsx(df, tmp)
+        os.replace(tmp, caminho)
+    return caminho
+
+
+def medir(caminho, repeticoes=3):
+    """Melhor tempo e maior pico por etapa, e os KPIs do relatório."""
+    with open(caminho, 'rb') as f:
+        dados = f.read()
+    nome = os.path.basename(caminho)
+    melhor = {}
+    for _ in range(repeticoes):
+        for c in cache.CACHES.values():
+            c.limpar()
+        with medicao.coletar(rotulo=f'benchmark {nome}') as m:
+            inicio = time.perf_counter()
+            df = ler_export(dados, nome)
+            ag, _ = agregados(df, cache.hash_bytes(dados))
+            pdf_relatorio('BENCHMARK', 2026, ag, d_str='01/01/2026 00:00')
+            total = time.perf_counter() - inicio
+        etapas = {'total': {'segundos': total, 'pico_mb': max(e['pico_mb'] or 0 for e in m.etapas)}}
+        for e in m.etapas:
+            etapas[e['etapa']] = {'segundos': e['segundos'], 'pico_mb': e['pico_mb'] or 0}
+        for k, v in etapas.items():
+            b = melhor.setdefault(k, v)
+            melhor[k] = {'segundos': min(b['segundos'], v['segundos']), 'pico_mb': max(b['pico_mb'], v['pico_mb'])}
+    return {'etapas': melhor, 'kpis': list(ag.kpis)}
+
+
+def concorrencia(linhas, concorrentes):
+    """{N: (segundos até o último terminar, latência de cada relatório)} com N relatórios
+    de exports distintos (sem acerto de cache) submetidos juntos à fila, como no app."""
+    exports = [gerar_export(linhas, semente=i).to_csv(index=False).encode('utf-8') for i in range(max(concorrentes))]
+
+    def relatorio(t, dados):
+        return t.em_processo(relatorio_app, cache.hash_bytes(dados), (dados, 'export.csv'), 'BENCHMARK', 2026)
+
+    r = {}
+    for n in concorrentes:
+        fila = Fila(workers=n)  # processos novos: caches vazios a cada N
+        fila.aquecer_processos(aquecer)
+        inicio = time.perf_counter()
+        tarefas = [fila.submeter(('benchmark', n, i), relatorio, exports[i]) for i in range(n)]
+        for t in tarefas:
+            t.esperar()
+            if t.erro:
+                raise t.erro
+        r[n] = (time.perf_counter() - inicio, [t.segundos for t in tarefas])
+        fila.fechar()
+    return r
+
+
+def alterar_export(df, alteradas=600, semente=0):
+    """Próximo export do mesmo evento: um terço das `alteradas` inscrições some, um
+    terço muda de categoria e um terço é nova (cópias com outro nº de inscrição)."""
+    rnd = np.random.default_rng(semente)
+    k = alteradas // 3
+    pos = rnd.choice(len(df), 2 * k, replace=False)
+    inscricao, categoria = df.columns[INDICES[0]], df.columns[INDICES[2]]
+    novo = df.drop(index=df.index[pos[:k]])
+    novo.loc[df.index[pos[k:]], categoria] = 'Palestrante'
+    extras = df.iloc[rnd.choice(len(df), alteradas - 2 * k, replace=False)].copy()
+    extras[inscricao] = [str(900_000_000 + i) for i in range(len(extras))]
+    return pd.concat([novo, extras], ignore_index=True)
+
+
+def medir_incremental(linhas, alteradas=600, repeticoes=3):
+    """Melhor tempo do cálculo completo e da atualização do snapshot sobre o mesmo export."""
+    caminho = export(linhas, 'csv')
+    with open(caminho, 'rb') as f:
+        anterior = ler_export(f.read(), caminho)
+    atual = alterar_export(anterior, alteradas)
+    pasta = tempfile.mkdtemp(prefix='benchmark_snapshot_')
+    try:
+        # Snapshot do export anterior, restaurado a cada repetição (fora da medição). Mesmo
+        # caminho: como num servidor que já processou o export anterior, os hashes estão em memória
+        snap, copia = os.path.join(pasta, 'snapshot'), os.path.join(pasta, 'copia')
+        snapshot.atualizar('benchmark', anterior, snap)
+        shutil.copytree(snap, copia)
+        completo, incremental, resumo = [], [], None
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            ag_completo = agregar(limpar(mapear_colunas(atual)))
+            completo.append(time.perf_counter() - inicio)
+
+            shutil.rmtree(snap)
+            shutil.copytree(copia, snap)
+            inicio = time.perf_counter()
+            cont, resumo = snapshot.atualizar('benchmark', atual, snap)
+            ag_incremental = montar(cont)
+            incremental.append(time.perf_counter() - inicio)
+        if ag_completo.kpis != ag_incremental.kpis:
+            raise AssertionError(f"KPIs diferentes: {ag_completo.kpis} x {ag_incremental.kpis}")
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+    return min(completo), min(incremental), resumo
+
+
+def comparar(atual, base, tolerancia):
+    """Linhas (conjunto, etapa, base, atual, variação, regressão?) para o relatório."""
+    r = []
+    for conj, a in atual.items():
+        b = base.get(conj)
+        if b is None:
+            continue
+        if a['kpis'] != b['kpis']:
+            r.append((conj, 'KPIs', str(b['kpis']), str(a['kpis']), '', True))
+        for etapa, v in a['etapas'].items():
+            bv = b['etapas'].get(etapa)
+            if bv is None:
+                continue
+            var = v['segundos'] / bv['segundos'] - 1 if bv['segundos'] else 0.0
+            pior = var > tolerancia and v['segundos'] - bv['segundos'] > MIN_SEGUNDOS
+            pior_mem = bv['pico_mb'] and v['pico_mb'] > bv['pico_mb'] * (1 + tolerancia)
+            r.append((conj, etapa, f"{bv['segundos']:.3f}s", f"{v['segundos']:.3f}s", f"{var:+.0%}", bool(pior or pior_mem)))
+    return r
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument('--linhas', type=int, nargs='+', default=ESCALAS)
+    p.add_argument('--formatos', nargs='+', choices=FORMATOS, default=FORMATOS)
+    p.add_argument('--repeticoes', type=int, default=3)
+    p.add_argument('--baseline', default=BASELINE)
+    p.add_argument('--salvar-baseline', action='store_true', help='grava os resultados como nova baseline')
+    p.add_argument('--tolerancia', type=float, default=0.25, help='piora relativa aceita (0.25 = 25%%)')
+    p.add_argument('--incremental', action='store_true', help='completo x snapshot para cada --linhas')
+    p.add_argument('--alteradas', type=int, default=600, help='inscrições novas/alteradas/removidas no --incremental')
+    p.add_argument('--concorrentes', type=int, nargs='+', help='mede N relatórios simultâneos na fila (usa o 1º --linhas)')
+    a = p.parse_args(argv)
+
+    if a.incremental:
+        for n in a.linhas:
+            completo, incremental, resumo = medir_incremental(n, a.alteradas, a.repeticoes)
+            print(f"{n:>9} linhas  completo {completo:7.3f}s  incremental {incremental:7.3f}s  "
+                  f"({completo / incremental:.1f}x)  " + ' '.join(f"{k} {v}" for k, v in resumo.items()))
+        return 0
+    if a.concorrentes:
+        for n, (total, latencias) in concorrencia(a.linhas[0], a.concorrentes).items():
+            print(f"{n:>3} simultâneo(s)  total {total:7.2f}s  latência média {sum(latencias) / n:7.2f}s  "
+                  f"máxima {max(latencias):7.2f}s  (processos: {PROCESSOS})")
+        return 0
+
+    atual = {}
+    for n in a.linhas:
+        for fmt in a.formatos:
+            conj = f'{n}/{fmt}'
+            res = atual[conj] = medir(export(n, fmt), a.repeticoes)
+            e = res['etapas']
+            print(f"{conj:>12}  total {e['total']['segundos']:7.3f}s  pico {e['total']['pico_mb']:7.1f} MB  | "
+                  + ' '.join(f"{k} {v['segundos']:.3f}" for k, v in e.items() if k != 'total'))
+
+    if a.salvar_baseline:
+        base = {}
+        if os.path.exists(a.baseline):
+            with open(a.baseline, encoding='utf-8') as f:
+                base = json.load(f)
+        base.update(atual)
+        with open(a.baseline, 'w', encoding='utf-8') as f:
+            json.dump(base, f, indent=1, sort_keys=True)
+        print(f"baseline gravada em {a.baseline}")
+        return 0
+    if not os.path.exists(a.baseline):
+        print("sem baseline para comparar (use --salvar-baseline)")
+        return 0
+    with open(a.baseline, encoding='utf-8') as f:
+        linhas = comparar(atual, json.load(f), a.tolerancia)
+    regressoes = [l for l in linhas if l[5]]
+    for conj, etapa, b, v, var, pior in regressoes:
+        print(f"REGRESSÃO {conj} {etapa}: {b} -> {v} {var}")
+    print(f"{len(regressoes)} regressão(ões) em {len(linhas)} comparações (tolerância {a.tolerancia:.0%})")
+    return 1 if regressoes else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
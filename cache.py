@@ -0,0 +1,98 @@
+"""Cache em memória, por etapa, chaveado pelo hash do conteúdo.
+
+O Streamlit reexecuta o app.py inteiro a cada interação, mas os módulos
+importados continuam vivos no processo: os caches abaixo sobrevivem entre
+reruns e são compartilhados entre sessões. Cada etapa tem seu próprio
+limite de itens e descarta o menos usado recentemente (LRU).
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class CacheLRU:
+    def __init__(self, max_itens):
+        self.max_itens = max_itens
+        self.hits = 0
+        self.misses = 0
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._itens)
+
+    def __contains__(self, chave):
+        return chave in self._itens
+
+    def get(self, chave, default=None):
+        with self._lock:
+            if chave not in self._itens:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._itens.move_to_end(chave)
+            return self._itens[chave]
+
+    def put(self, chave, valor):
+        with self._lock:
+            self._itens[chave] = valor
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def memo(self, chave, func):
+        """Devolve o valor em cache ou calcula `func()` e guarda."""
+        faltando = object()
+        valor = self.get(chave, faltando)
+        if valor is faltando:
+            valor = func()
+            self.put(chave, valor)
+        return valor
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self.hits = self.misses = 0
+
+
+# Etapas do pipeline. DataFrames brutos são os itens mais pesados.
+CACHES = {
+    'leitura': CacheLRU(16),   # DataFrame bruto (já podado), por hash do arquivo
+    'limpeza': CacheLRU(8),    # df_clean, por hash bruto + MAPEAMENTO_VERSAO
+    'graficos': CacheLRU(48),  # Imagens (SVG/PNG), por hash dos agregados de cada gráfico
+    'pdf': CacheLRU(16),       # PDF final, por hash do HTML completo (no app: pelas entradas do relatório)
+    'exports': CacheLRU(16),   # Export baixado pelo robô (bytes, nome), por hash do arquivo
+}
+
+
+def memo(etapa, chave, func):
+    return CACHES[etapa].memo(chave, func)
+
+
+def estatisticas():
+    import pandas as pd
+    return pd.DataFrame(
+        [(etapa, c.hits, c.misses, len(c), c.max_itens) for etapa, c in CACHES.items()],
+        columns=['Etapa', 'Hits', 'Misses', 'Itens', 'Limite'],
+    ).set_index('Etapa')
+
+
+def hash_bytes(dados):
+    return hashlib.blake2b(dados, digest_size=16).hexdigest()
+
+
+def hash_obj(*partes):
+    """Hash estável de strings, números e objetos pandas (valores, índice e nomes)."""
+    import pandas as pd
+    h = hashlib.blake2b(digest_size=16)
+    for p in partes:
+        if isinstance(p, (pd.Series, pd.DataFrame)):
+            h.update(pd.util.hash_pandas_object(p, index=True).to_numpy().tobytes())
+            nomes = p.columns if isinstance(p, pd.DataFrame) else [p.name]
+            h.update(repr(list(nomes)).encode())
+        elif isinstance(p, bytes):
+            h.update(p)
+        else:
+            h.update(repr(p).encode())
+        h.update(b'\x00')
+    return h.hexdigest()
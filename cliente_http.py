@@ -0,0 +1,229 @@
+"""Download do export do iweventos por HTTP direto, sem navegador.
+
+Faz o mesmo que o robô Selenium — login em /sistema/not/acesso/login, marca
+os `agrupador_*` e envia o formulário do `btGerar` — mas com uma
+requests.Session: cookies mantidos, conexões reaproveitadas e o export lido
+em streaming para a memória. Os formulários são lidos da própria página, de
+modo que campos ocultos (tokens etc.) seguem junto. Se o site mudar e este
+caminho falhar, o app cai para o robô Selenium.
+"""
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from html.parser import HTMLParser
+from io import BytesIO
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import medicao
+from cache import CacheLRU
+from robo import AGRUPADORES, URL_LOGIN, URL_RELATORIO, Download, credencial, url
+
+MAX_CONEXOES = 8
+TIMEOUT = (10, 120)  # (conexão, leitura)
+BLOCO = 64 * 1024
+
+
+class _Formularios(HTMLParser):
+    """Extrai os <form> da página com seus campos e botões.
+
+    De cada <select> guarda as <option> (valor e se vem selecionada); de cada
+    <textarea>, o texto, que é o valor que o navegador envia.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.forms = []
+        self._select = self._option = self._textarea = None
+
+    def handle_starttag(self, tag, attrs):
+        a = {k: (v if v is not None else '') for k, v in attrs}
+        if tag == 'form':
+            self.forms.append({'action': a.get('action', ''), 'method': a.get('method', 'get').lower(),
+                               'campos': [], 'ids': set()})
+        elif tag == 'option' and self._select is not None:
+            # Sem atributo value, o valor é o texto da opção
+            self._option = {'value': a.get('value'), 'texto': '', 'selected': 'selected' in a,
+                            'disabled': 'disabled' in a}
+            self._select['_opcoes'].append(self._option)
+        elif self.forms and tag in ('input', 'button', 'select', 'textarea'):
+            a['_tag'] = tag
+            self.forms[-1]['campos'].append(a)
+            if a.get('id'):
+                self.forms[-1]['ids'].add(a['id'])
+            if tag == 'select':
+                a['_opcoes'], self._select = [], a
+            elif tag == 'textarea':
+                a['value'], self._textarea = '', a
+
+    def handle_data(self, data):
+        if self._option is not None:
+            self._option['texto'] += data
+        elif self._textarea is not None:
+            self._textarea['value'] += data
+
+    def handle_endtag(self, tag):
+        if tag in ('option', 'select'):
+            self._option = None
+        if tag == 'select':
+            self._select = None
+        elif tag == 'textarea' and self._textarea is not None:
+            # Como no navegador, a quebra de linha logo após <textarea> não conta
+            v = self._textarea['value']
+            self._textarea['value'] = v[1:] if v.startswith('\n') else v
+            self._textarea = None
+
+
+def _formularios(html):
+    p = _Formularios()
+    p.feed(html)
+    return p.forms
+
+
+def _opcoes_enviadas(select):
+    """Valores que o navegador envia de um <select>: as opções selecionadas ou,
+    num select simples sem nenhuma, a primeira opção habilitada."""
+    opcoes = [o for o in select['_opcoes'] if not o['disabled']]
+    valor = lambda o: o['value'] if o['value'] is not None else ' '.join(o['texto'].split())
+    selecionadas = [o for o in opcoes if o['selected']]
+    if 'multiple' in select:
+        return [valor(o) for o in selecionadas]
+    if selecionadas:
+        return [valor(selecionadas[-1])]
+    return [valor(opcoes[0])] if opcoes else []
+
+
+def _dados_form(form, marcar=(), botao=None):
+    """Valores que o navegador enviaria, com as checkboxes de `marcar` ligadas."""
+    dados = []
+    for c in form['campos']:
+        nome, tipo = c.get('name'), c.get('type', 'text').lower()
+        if not nome or 'disabled' in c:
+            continue
+        classes = set(c.get('class', '').split())
+        if tipo == 'checkbox' or tipo == 'radio':
+            if 'checked' in c or classes & set(marcar):
+                dados.append((nome, c.get('value', 'on')))
+        elif c['_tag'] == 'button' or tipo in ('submit', 'button', 'image', 'reset'):
+            if botao and c.get('id') == botao:
+                dados.append((nome, c.get('value', '')))
+        elif c['_tag'] == 'select':
+            dados.extend((nome, v) for v in _opcoes_enviadas(c))
+        elif c['_tag'] in ('input', 'textarea'):
+            dados.append((nome, c.get('value', '')))
+    return dados
+
+
+def _enviar(sessao, form, base, dados, **kw):
+    """Submete o formulário como o navegador faria (GET na query string, senão POST)."""
+    destino = urljoin(base, form['action'])
+    if form['method'] == 'get':
+        return sessao.get(destino, params=dados, timeout=TIMEOUT, **kw)
+    return sessao.post(destino, data=dados, timeout=TIMEOUT, **kw)
+
+
+def _nome_arquivo(resp, padrao):
+    m = re.search(r'filename\*?=(?:UTF-8\'\')?"?([^";]+)', resp.headers.get('Content-Disposition', ''))
+    return m.group(1) if m else padrao
+
+
+class ClienteIweventos:
+    """Sessão HTTP compartilhada entre threads; faz login uma vez por subdomínio."""
+
+    def __init__(self, max_conexoes=MAX_CONEXOES):
+        self.sessao = requests.Session()
+        self.sessao.headers['User-Agent'] = 'Mozilla/5.0 (relatorio-evento)'
+        adaptador = HTTPAdapter(pool_connections=max_conexoes, pool_maxsize=max_conexoes,
+                                max_retries=Retry(total=2, backoff_factor=0.3, allowed_methods=['GET']))
+        self.sessao.mount('http://', adaptador)
+        self.sessao.mount('https://', adaptador)
+        self._logins = {}
+        self._lock = threading.Lock()
+
+    def _lock_login(self, subdominio):
+        with self._lock:
+            return self._logins.setdefault(subdominio, threading.Lock())
+
+    @medicao.medido('login')
+    def login(self, subdominio, usuario, senha):
+        r = self.sessao.get(url(subdominio, URL_LOGIN), timeout=TIMEOUT)
+        r.raise_for_status()
+        forms = [f for f in _formularios(r.text) if any(c.get('type') == 'password' for c in f['campos'])]
+        if not forms:
+            raise Exception("Campos de login não encontrados.")
+        form = forms[0]
+        dados = dict(_dados_form(form))
+        for c in form['campos']:
+            nome = c.get('name')
+            if c.get('type') == 'password':
+                dados[nome] = senha
+            elif nome in ('login', 'usuario') or c.get('id') in ('login', 'usuario'):
+                dados[nome] = usuario
+        r = _enviar(self.sessao, form, r.url, dados)
+        if "login" in r.url:
+            raise Exception("Login falhou. Verifique usuário e senha.")
+
+    def pagina_relatorio(self, subdominio, edicao, usuario, senha):
+        endereco = url(subdominio, URL_RELATORIO.format(edicao=edicao))
+        r = self.sessao.get(endereco, timeout=TIMEOUT)
+        if "login" in r.url:
+            with self._lock_login(subdominio):
+                # Outra thread pode ter logado enquanto esperávamos
+                r = self.sessao.get(endereco, timeout=TIMEOUT)
+                if "login" in r.url:
+                    self.login(subdominio, usuario, senha)
+                    r = self.sessao.get(endereco, timeout=TIMEOUT)
+            if "login" in r.url:
+                raise Exception("Login falhou. Verifique usuário e senha.")
+        r.raise_for_status()
+        return r
+
+    def baixar(self, subdominio, edicao, usuario, senha):
+        """Devolve (bytes do export, nome do arquivo)."""
+        pagina = self.pagina_relatorio(subdominio, edicao, usuario, senha)
+        forms = [f for f in _formularios(pagina.text) if 'btGerar' in f['ids']]
+        if not forms:
+            raise Exception("Formulário do relatório (btGerar) não encontrado.")
+        form = forms[0]
+        dados = _dados_form(form, marcar=AGRUPADORES, botao='btGerar')
+        with medicao.etapa('download', edicao=edicao), _enviar(self.sessao, form, pagina.url, dados, stream=True) as r:
+            r.raise_for_status()
+            if 'text/html' in r.headers.get('Content-Type', ''):
+                raise Exception("O site devolveu uma página em vez do export.")
+            buf = BytesIO()
+            for bloco in r.iter_content(BLOCO):
+                buf.write(bloco)
+            return buf.getvalue(), _nome_arquivo(r, f'inscricoes_{edicao}.xlsx')
+
+
+# Um cliente por credencial: a sessão (cookies e conexões) sobrevive aos
+# reruns, mas nunca é compartilhada entre usuários diferentes
+_clientes = CacheLRU(16)
+
+
+def cliente_para(usuario, senha):
+    return _clientes.memo(credencial(usuario, senha), ClienteIweventos)
+
+
+def baixar_http(subdominio, edicao, usuario, senha, cliente=None):
+    """Como robo.baixar, mas em memória: `dados` traz os bytes e `caminho` só o nome do arquivo."""
+    cliente = cliente or cliente_para(usuario, senha)
+    inicio = time.monotonic()
+    try:
+        dados, nome = cliente.baixar(subdominio, edicao, usuario, senha)
+        return Download(subdominio, edicao, nome, None, time.monotonic() - inicio, dados)
+    except Exception as e:
+        return Download(subdominio, edicao, None, e)
+
+
+def baixar_lote_http(jobs, usuario, senha, cliente=None, max_paralelo=MAX_CONEXOES):
+    """Baixa várias edições em paralelo; gera os resultados conforme terminam."""
+    cliente = cliente or cliente_para(usuario, senha)
+    with ThreadPoolExecutor(max_workers=max_paralelo) as ex:
+        futuros = [ex.submit(medicao.propagar(baixar_http), sub, ed, usuario, senha, cliente) for sub, ed in jobs]
+        for f in as_completed(futuros):
+            yield f.result()
@@ -0,0 +1,213 @@
+"""Fila de tarefas em segundo plano, compartilhada pelas sessões do app.
+
+As tarefas rodam num pool pequeno de threads do processo, não na thread do
+script do Streamlit: a sessão só submete e acompanha a tarefa pelo id
+(polling), e os reruns continuam leves. Uma tarefa com a mesma chave de
+outra ainda em andamento não é enfileirada de novo: quem submeteu recebe a
+tarefa existente. Cada tarefa tem sua própria pasta temporária
+(`tarefa.pasta`), apagada quando ela termina.
+
+    t = fila_padrao().submeter(('relatorio', chave), gerar, dados, descricao='Relatório')
+    ...
+    t = fila_padrao().tarefa(t.id)   # em outro rerun
+    t.estado, t.fracao, t.mensagem, t.resultado, t.erro
+
+As threads só servem para o que espera (rede, downloads, polling): sob o
+GIL, limpeza, gráficos e PDF em threads se revezariam num núcleo e cada
+relatório simultâneo atrasaria os outros. A parte CPU-bound vai para um
+pool de processos (um por núcleo) com `tarefa.em_processo(func, ...)`;
+`func` precisa ser importável (nível de módulo) e os argumentos, picklable.
+As etapas medidas no processo voltam para `tarefa.medicao`.
+"""
+import atexit
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import types
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import medicao
+
+# Threads passam quase todo o tempo esperando (rede, processos): não dependem dos núcleos
+MAX_WORKERS = int(os.environ.get('RELATORIO_WORKERS', 4))
+# Processos para as etapas CPU-bound: mais que um por núcleo só dividiria o mesmo núcleo
+PROCESSOS = int(os.environ.get('RELATORIO_PROCESSOS', os.cpu_count() or 1))
+MAX_TAREFAS = 64  # terminadas que continuam consultáveis pelo id
+
+NA_FILA, EXECUTANDO, CONCLUIDA, ERRO = 'na fila', 'executando', 'concluída', 'erro'
+
+
+class Tarefa:
+    def __init__(self, chave, descricao=''):
+        self.id = uuid.uuid4().hex[:12]
+        self.chave, self.descricao = chave, descricao
+        self.estado, self.fracao, self.mensagem = NA_FILA, 0.0, 'Na fila...'
+        self.resultado = self.erro = self.pasta = None
+        self.criada, self.inicio, self.fim = time.monotonic(), None, None
+        # Etapas medidas dentro da tarefa (a thread do worker não vê a medição da sessão)
+        self.medicao = medicao.Medicao(f"{descricao} [{self.id}]")
+        self._feita = threading.Event()
+        self._fila = None
+
+    def progresso(self, fracao=None, mensagem=None):
+        """Chamado pela própria tarefa; lido pela sessão no polling."""
+        if fracao is not None: self.fracao = min(max(fracao, 0.0), 1.0)
+        if mensagem is not None: self.mensagem = mensagem
+
+    def em_processo(self, func, *args, mensagem=None, **kwargs):
+        """`func(*args, **kwargs)` num processo da fila; espera e devolve o resultado.
+
+        Enquanto todos os processos estão ocupados, a mensagem diz que a tarefa
+        aguarda um processo livre; depois, mostra `mensagem`.
+        """
+        return self._fila.em_processo(self, func, args, kwargs, mensagem)
+
+    @property
+    def terminada(self):
+        return self._feita.is_set()
+
+    def esperar(self, timeout=None):
+        return self._feita.wait(timeout)
+
+    @property
+    def segundos(self):
+        """Tempo desde a submissão (inclui a espera na fila)."""
+        return (self.fim or time.monotonic()) - self.criada
+
+
+def _no_processo(func, args, kwargs):
+    """Roda no processo filho: devolve (resultado, etapas medidas, exceção ou None)."""
+    with medicao.coletar() as m:
+        try:
+            return func(*args, **kwargs), m.etapas, None
+        except Exception as e:
+            return None, m.etapas, e
+
+
+class Fila:
+    def __init__(self, workers=MAX_WORKERS, processos=PROCESSOS, max_tarefas=MAX_TAREFAS):
+        self.workers, self.processos, self.max_tarefas = workers, processos, max_tarefas
+        self._ex = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='fila')
+        self._pool = None  # ProcessPoolExecutor, criado no primeiro uso
+        self._pool_lock = threading.Lock()
+        self._tarefas = OrderedDict()  # id -> Tarefa
+        self._andamento = {}           # chave -> Tarefa ainda não terminada
+        self._lock = threading.Lock()
+
+    def submeter(self, chave, func, *args, descricao='', **kwargs):
+        """Enfileira `func(tarefa, *args, **kwargs)`; se `chave` já está em andamento, devolve aquela tarefa."""
+        with self._lock:
+            t = self._andamento.get(chave)
+            if t is not None:
+                return t
+            t = self._andamento[chave] = Tarefa(chave, descricao)
+            t._fila = self
+            self._tarefas[t.id] = t
+            self._podar()
+        self._ex.submit(self._rodar, t, func, args, kwargs)
+        return t
+
+    def tarefa(self, id_tarefa):
+        with self._lock:
+            return self._tarefas.get(id_tarefa)
+
+    def posicao(self, t):
+        """Quantas tarefas submetidas antes de `t` ainda esperam na fila."""
+        with self._lock:
+            return sum(1 for x in self._andamento.values() if x.estado == NA_FILA and x.criada < t.criada)
+
+    def _podar(self):
+        # Só descarta terminadas, das mais antigas para as mais novas
+        excesso = len(self._tarefas) - self.max_tarefas
+        for i in [i for i, x in self._tarefas.items() if x.terminada][:max(excesso, 0)]:
+            del self._tarefas[i]
+
+    def _rodar(self, t, func, args, kwargs):
+        t.estado, t.inicio = EXECUTANDO, time.monotonic()
+        t.progresso(mensagem='Executando...')
+        t.pasta = tempfile.mkdtemp(prefix=f'relatorio_{t.id}_')
+        try:
+            with medicao.coletar(t.medicao):
+                t.resultado = func(t, *args, **kwargs)
+            t.estado, t.fracao = CONCLUIDA, 1.0
+        except Exception as e:
+            t.erro, t.estado = e, ERRO
+        finally:
+            shutil.rmtree(t.pasta, ignore_errors=True)
+            t.fim = time.monotonic()
+            with self._lock:
+                if self._andamento.get(t.chave) is t:
+                    del self._andamento[t.chave]
+            t._feita.set()
+
+    def _processos(self):
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: fork de um processo com threads (o servidor do Streamlit) pode travar
+                pool = ProcessPoolExecutor(self.processos, mp_context=multiprocessing.get_context('spawn'))
+                # Cada processo novo importaria o __main__, que sob o Streamlit é o app.py
+                # (rodaria a interface e subiria outra fila). Nada do que vai para os processos
+                # vem dele: sobem todos agora, com um __main__ vazio no lugar.
+                principal = sys.modules['__main__']
+                sys.modules['__main__'] = types.ModuleType('__main__')
+                try:
+                    for _ in range(self.processos):
+                        pool.submit(os.getpid)
+                finally:
+                    sys.modules['__main__'] = principal
+                self._pool = pool
+            return self._pool
+
+    def em_processo(self, t, func, args=(), kwargs=None, mensagem=None):
+        pool = self._processos()
+        try:
+            fut = pool.submit(_no_processo, func, args, kwargs or {})
+            while not fut.done():
+                t.progresso(mensagem=(mensagem or 'Processando...') if fut.running()
+                            else 'Aguardando um processo livre...')
+                wait([fut], timeout=0.2)
+            r, etapas, erro = fut.result()
+        except BrokenProcessPool:
+            # Um processo morreu (ex.: sem memória): o pool não aceita mais nada, recria no próximo uso
+            with self._pool_lock:
+                if self._pool is pool:
+                    self._pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        with t.medicao._lock:
+            t.medicao.etapas.extend(etapas)
+        if erro is not None:
+            raise erro
+        return r
+
+    def aquecer_processos(self, func):
+        """Sobe os processos e roda `func` (ex.: imports e fontes) em cada um, antes do 1º uso."""
+        pool = self._processos()
+        wait([pool.submit(_no_processo, func, (), {}) for _ in range(self.processos)])
+
+    def fechar(self):
+        self._ex.shutdown(wait=False, cancel_futures=True)
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_fila = None
+_fila_lock = threading.Lock()
+
+
+def fila_padrao():
+    """Fila do processo, compartilhada entre sessões e reruns do Streamlit."""
+    global _fila
+    with _fila_lock:
+        if _fila is None:
+            _fila = Fila()
+            atexit.register(_fila.fechar)
+        return _fila
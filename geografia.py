@@ -0,0 +1,71 @@
+"""Índice geográfico: as 27 UFs, seus nomes e as grafias comuns nos exports.
+
+O campo UF do iweventos é texto livre: vem "SP", "São Paulo", "sao paulo",
+"SP - São Paulo", "Sao Paulo/SP", "S. Paulo"... Tudo é reduzido a uma chave
+só de letras A-Z (sem acento, espaço ou pontuação) e procurado no índice
+abaixo, montado uma vez na importação. `resolver_uf` é memoizado: cada texto
+distinto é normalizado e resolvido uma única vez por processo.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+
+# sigla: (nome, região)
+UFS = {
+    'AC': ('Acre', 'Norte'), 'AL': ('Alagoas', 'Nordeste'), 'AP': ('Amapá', 'Norte'),
+    'AM': ('Amazonas', 'Norte'), 'BA': ('Bahia', 'Nordeste'), 'CE': ('Ceará', 'Nordeste'),
+    'DF': ('Distrito Federal', 'Centro-Oeste'), 'ES': ('Espírito Santo', 'Sudeste'),
+    'GO': ('Goiás', 'Centro-Oeste'), 'MA': ('Maranhão', 'Nordeste'), 'MT': ('Mato Grosso', 'Centro-Oeste'),
+    'MS': ('Mato Grosso do Sul', 'Centro-Oeste'), 'MG': ('Minas Gerais', 'Sudeste'), 'PA': ('Pará', 'Norte'),
+    'PB': ('Paraíba', 'Nordeste'), 'PR': ('Paraná', 'Sul'), 'PE': ('Pernambuco', 'Nordeste'),
+    'PI': ('Piauí', 'Nordeste'), 'RJ': ('Rio de Janeiro', 'Sudeste'), 'RN': ('Rio Grande do Norte', 'Nordeste'),
+    'RS': ('Rio Grande do Sul', 'Sul'), 'RO': ('Rondônia', 'Norte'), 'RR': ('Roraima', 'Norte'),
+    'SC': ('Santa Catarina', 'Sul'), 'SP': ('São Paulo', 'Sudeste'), 'SE': ('Sergipe', 'Nordeste'),
+    'TO': ('Tocantins', 'Norte'),
+}
+REGIAO_UF = {uf: regiao for uf, (_, regiao) in UFS.items()}
+
+# Grafias alternativas vistas nos exports (erros de digitação, abreviações e capitais
+# sem homônimo em outra UF)
+VARIANTES = {
+    'AC': ['ACR'], 'AL': ['ALAGOA', 'ALAGOS'], 'AP': ['AMAPA', 'MACAPA'], 'AM': ['AMAZONA', 'AMAZONIA', 'MANAUS'],
+    'BA': ['BAIA', 'BAHI', 'SALVADOR'], 'CE': ['CEARA', 'CERA', 'FORTALEZA'],
+    'DF': ['DISTRITOFEDEREAL', 'DISTFEDERAL', 'BRASILIA', 'BSB'], 'ES': ['ESPIRITOSANTOS', 'ESPSANTO'],
+    'GO': ['GOAIS', 'GOIAZ', 'GOIANIA'], 'MA': ['MARANHAO', 'MARANHO', 'SAOLUIS'],
+    'MT': ['MATOGROSO', 'MTGROSSO', 'CUIABA'], 'MS': ['MATOGROSSOSUL', 'MATOGROSODOSUL', 'MTGROSSODOSUL', 'MTGROSSOSUL'],
+    'MG': ['MINAS', 'MINASGERIAS', 'MINASGERAES', 'BELOHORIZONTE', 'BH'], 'PA': ['PARA', 'BELEM'],
+    'PB': ['PARAIBA', 'PARAHYBA', 'JOAOPESSOA'], 'PR': ['PARANA', 'PARANAH', 'CURITIBA'],
+    'PE': ['PERNANBUCO', 'PERNAMBUCCO', 'RECIFE'], 'PI': ['PIAUI', 'PIAUHY', 'TERESINA'],
+    'RJ': ['RIODEJANIERO', 'RIOJANEIRO', 'RIODEJANERO'], 'RN': ['RIOGRANDEDONORTE', 'RGN', 'RGNORTE', 'NATAL'],
+    'RS': ['RIOGRANDEDOSUL', 'RGS', 'RGSUL', 'RIOGRANDESUL', 'PORTOALEGRE'], 'RO': ['RONDONIA', 'PORTOVELHO'],
+    'RR': ['RORAIMA', 'RORAYMA'], 'SC': ['SANTACATARINA', 'STACATARINA', 'STCATARINA', 'FLORIANOPOLIS'],
+    'SP': ['SAOPAULO', 'SPAULO', 'SAOPAULOCAPITAL', 'SAMPA', 'SAOPAOLO'], 'SE': ['SERGIPE', 'SERGIPI', 'ARACAJU'],
+    'TO': ['TOCANTIS', 'TOCANTINS'],
+}
+
+# Partes de textos compostos como "SP - São Paulo" ou "Sao Paulo/SP"
+SEPARADORES = re.compile(r'[-/|(),;]+')
+
+
+def chave(txt):
+    """Texto -> só letras A-Z maiúsculas ("São  Paulo " -> "SAOPAULO")."""
+    txt = unicodedata.normalize('NFKD', txt).encode('ASCII', 'ignore').decode('ASCII').upper()
+    return re.sub(r'[^A-Z]', '', txt)
+
+
+INDICE = {}
+for _uf, (_nome, _) in UFS.items():
+    for _k in [_uf, _nome, *VARIANTES[_uf]]:
+        INDICE[chave(_k)] = _uf
+
+
+@lru_cache(maxsize=4096)
+def resolver_uf(txt):
+    """Sigla da UF para um texto livre, ou None se não reconhecido (ou ambíguo)."""
+    if not isinstance(txt, str):
+        return None
+    uf = INDICE.get(chave(txt))
+    if uf or not SEPARADORES.search(txt):
+        return uf
+    achadas = {INDICE.get(chave(p)) for p in SEPARADORES.split(txt)} - {None}
+    return achadas.pop() if len(achadas) == 1 else None
@@ -0,0 +1,108 @@
+"""Gráficos do relatório (Matplotlib, API orientada a objetos no backend Agg).
+
+Nada passa pelo pyplot: cada thread reaproveita suas próprias figuras (só
+limpas entre um relatório e outro) e o estilo ggplot é aplicado por
+rc_context, sem mexer no estado global. Cada gráfico sai como `Imagem`
+(bytes + mime), entregue ao WeasyPrint como recurso em memória (ver
+relatorio.gerar_pdf). SVG é o padrão (vetorial no PDF);
+RELATORIO_GRAFICOS=png volta ao bitmap de 120 dpi.
+"""
+import os
+import threading
+from collections import namedtuple
+from io import BytesIO
+
+import matplotlib.style
+import numpy as np
+from matplotlib import rc_context
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from medicao import medido
+
+FORMATO = os.environ.get('RELATORIO_GRAFICOS', 'svg')
+DPI = 120
+MIME = {'svg': 'image/svg+xml', 'png': 'image/png'}
+
+ESTILO = {**matplotlib.style.library['ggplot'],
+          # Texto do SVG como <text> (fonte do PDF) em vez de curvas: bem menor
+          'svg.fonttype': 'none', 'svg.hashsalt': 'relatorio'}
+
+Imagem = namedtuple('Imagem', ['dados', 'mime'])
+
+_local = threading.local()
+
+
+def _figura(nome, tamanho):
+    """Figura persistente da thread atual, limpa e com um único eixo."""
+    figs = _local.__dict__.setdefault('figs', {})
+    fig = figs.get(nome)
+    if fig is None:
+        fig = figs[nome] = Figure(figsize=tamanho)
+        FigureCanvasAgg(fig)
+    else:
+        fig.clear()
+    return fig, fig.add_subplot()
+
+
+def salvar(fig, formato=None):
+    formato = formato or FORMATO
+    b = BytesIO(); fig.savefig(b, format=formato, dpi=DPI, transparent=True)
+    return Imagem(b.getvalue(), MIME[formato])
+
+
+def aquecer():
+    """Carrega fontes (font_manager/FreeType) e o backend de saída antes do 1º gráfico."""
+    with rc_context(ESTILO):
+        fig = Figure(figsize=(2, 2))
+        FigureCanvasAgg(fig)
+        fig.add_subplot().set_title('0123 Aberto')
+        salvar(fig)
+
+
+# 1. Pizza (Região)
+@medido('grafico_regiao')
+def grafico_regiao(d_reg, formato=None):
+    with rc_context(ESTILO):
+        f1, a1 = _figura('regiao', (7,5))
+        wedges, texts, autotexts = a1.pie(d_reg, labels=d_reg.index, autopct='%1.1f%%', startangle=90)
+        for t in autotexts: t.set(size=10, weight="bold", color="white")
+        return salvar(f1, formato)
+
+
+# 2. Barras (Idade)
+@medido('grafico_idade')
+def grafico_idade(d_id, formato=None):
+    with rc_context(ESTILO):
+        f2, a2 = _figura('idade', (7,5))
+        x = np.arange(len(d_id))
+        barras = a2.bar(x, d_id.to_numpy(), width=0.5, color='#3498db')
+        a2.set_xticks(x, [str(i) for i in d_id.index]); a2.set_xlabel(d_id.index.name or '')
+        a2.bar_label(barras, padding=3)
+        a2.set_ylim(top=max(d_id.values)*1.2 if len(d_id)>0 else 1)
+        return salvar(f2, formato)
+
+
+# 3. Evolução (Status unificados)
+@medido('grafico_evolucao')
+def grafico_evolucao(df_evo, formato=None):
+    with rc_context(ESTILO):
+        f3, a3 = _figura('evolucao', (12,5))
+        a3.plot(df_evo.index, df_evo['Pago'], marker='o', color='#27ae60', label='Pagos')
+        a3.plot(df_evo.index, df_evo['Cortesia'], marker='o', color='#f39c12', label='Cortesia')
+        a3.plot(df_evo.index, df_evo['Aberto'], marker='o', color='#c0392b', label='Aberto')
+
+        a3.legend(); a3.grid(True, linestyle='--', alpha=0.5)
+
+        # Eixo X Otimizado: dia, + mês na 1ª semana do mês, + ano na 1ª do ano
+        dates = df_evo.index
+        novo_mes = np.diff(dates.month.to_numpy(), prepend=-1) != 0
+        novo_ano = np.diff(dates.year.to_numpy(), prepend=-1) != 0
+        labels = [f"{d.day}" + (f"\n{d:%b}" if m else '') + (f"\n{d.year}" if a else '')
+                  for d, m, a in zip(dates, novo_mes, novo_ano)]
+        # Uma coleção por tipo de linha em vez de um axvline por semana
+        eixo_x = a3.get_xaxis_transform()
+        a3.vlines(dates[novo_mes], 0, 1, transform=eixo_x, colors='#ccc', linestyles='--')
+        a3.vlines(dates[novo_ano], 0, 1, transform=eixo_x, colors='#666', linestyles='-')
+        a3.set_xticks(dates, labels, fontsize=8)
+        return salvar(f3, formato)
@@ -0,0 +1,185 @@
+"""Leitura rápida dos exports do iweventos (CSV / Excel).
+
+Só as 10 colunas usadas pelo relatório (limpeza.INDICES) são lidas. O CSV
+tem separador e encoding detectados uma única vez a partir dos primeiros KB;
+o .xlsx é lido em streaming (openpyxl read-only) ou pelo python-calamine
+quando instalado. Exports fora do layout esperado caem na leitura completa
+original, e o app segue para o mapeamento alternativo de colunas.
+
+`ler_blocos` é o modo streaming: devolve o export em blocos de
+BLOCO_LINHAS linhas (CSV via chunksize, .xlsx linha a linha pelo openpyxl),
+sem nunca ter o arquivo inteiro como DataFrame.
+"""
+import codecs
+import csv
+import os
+from io import BytesIO
+from itertools import count
+
+import pandas as pd
+
+from limpeza import COLUNAS, INDICES
+from medicao import etapa, medido
+
+try:
+    import python_calamine  # noqa: F401
+    HAS_CALAMINE = True
+except ImportError:
+    HAS_CALAMINE = False
+
+AMOSTRA_BYTES = 16 * 1024
+SEPARADORES = ',;\t|'
+BLOCO_LINHAS = int(os.environ.get('RELATORIO_BLOCO_LINHAS', 50_000))
+
+
+def detectar_encoding(amostra):
+    if amostra.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    try:
+        # Decoder incremental: a amostra pode terminar no meio de um caractere
+        codecs.getincrementaldecoder('utf-8')().decode(amostra, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'latin-1'
+
+
+def detectar_separador(texto):
+    # Só linhas completas da amostra
+    if '\n' in texto: texto = texto[:texto.rfind('\n')]
+    cabecalho = texto.splitlines()[0] if texto else ''
+    try:
+        return csv.Sniffer().sniff(texto, delimiters=SEPARADORES).delimiter
+    except csv.Error:
+        return max(SEPARADORES, key=cabecalho.count)
+
+
+def _opcoes_csv(amostra):
+    encoding = detectar_encoding(amostra)
+    return dict(sep=detectar_separador(amostra.decode(encoding, errors='ignore')), encoding=encoding)
+
+
+def ler_csv(dados):
+    opcoes = _opcoes_csv(dados[:AMOSTRA_BYTES])
+    try:
+        df = pd.read_csv(BytesIO(dados), usecols=INDICES, dtype=str, **opcoes)
+    except ValueError:
+        # Menos colunas que o layout esperado: lê tudo como antes
+        return pd.read_csv(BytesIO(dados), **opcoes)
+    df.columns = COLUNAS
+    return df
+
+
+def _ler_xlsx_openpyxl(dados):
+    import openpyxl
+    wb = openpyxl.load_workbook(BytesIO(dados), read_only=True, data_only=True)
+    try:
+        linhas = wb.active.iter_rows(values_only=True)
+        cabecalho = next(linhas, ())
+        if len(cabecalho) <= max(INDICES):
+            return None
+        colunas = [[] for _ in INDICES]
+        for linha in linhas:
+            for col, i in zip(colunas, INDICES):
+                col.append(linha[i] if i < len(linha) else None)
+    finally:
+        wb.close()
+    # Remove linhas vazias no fim (dimensão da planilha maior que os dados)
+    n = len(colunas[0])
+    while n and all(col[n - 1] is None for col in colunas):
+        n -= 1
+    return pd.DataFrame({nome: col[:n] for nome, col in zip(COLUNAS, colunas)})
+
+
+def ler_xlsx(dados):
+    if HAS_CALAMINE:
+        try:
+            df = pd.read_excel(BytesIO(dados), engine='calamine', usecols=INDICES)
+            df.columns = COLUNAS
+            return df
+        except ValueError:
+            return pd.read_excel(BytesIO(dados), engine='calamine')
+    df = _ler_xlsx_openpyxl(dados)
+    if df is None:
+        return pd.read_excel(BytesIO(dados))
+    return df
+
+
+@medido('leitura', linhas=len)
+def ler_export(dados, nome):
+    """Lê o export (bytes) e devolve só as colunas do relatório, já nomeadas."""
+    nome = nome.lower()
+    if nome.endswith('.csv'):
+        return ler_csv(dados)
+    if nome.endswith('.xlsx'):
+        return ler_xlsx(dados)
+    return pd.read_excel(BytesIO(dados))
+
+
+def _abrir(fonte):
+    """Bytes ou caminho -> arquivo binário posicionado no início."""
+    return BytesIO(fonte) if isinstance(fonte, (bytes, bytearray)) else open(fonte, 'rb')
+
+
+def _blocos_csv(f, linhas):
+    opcoes = _opcoes_csv(f.read(AMOSTRA_BYTES))
+    f.seek(0)
+    try:
+        leitor = pd.read_csv(f, usecols=INDICES, dtype=str, chunksize=linhas, **opcoes)
+        colunas = COLUNAS
+    except ValueError:
+        f.seek(0)
+        leitor = pd.read_csv(f, chunksize=linhas, **opcoes)
+        colunas = None
+    with leitor:
+        for b in leitor:
+            if colunas: b.columns = colunas
+            yield b
+
+
+def _blocos_xlsx(f, linhas):
+    import openpyxl
+    wb = openpyxl.load_workbook(f, read_only=True, data_only=True)
+    try:
+        it = wb.active.iter_rows(values_only=True)
+        cabecalho = next(it, ())
+        if len(cabecalho) <= max(INDICES):
+            wb.close(); f.seek(0)
+            yield pd.read_excel(f)
+            return
+        while True:
+            colunas = [[] for _ in INDICES]
+            for linha in it:
+                for col, i in zip(colunas, INDICES):
+                    col.append(linha[i] if i < len(linha) else None)
+                if len(colunas[0]) == linhas:
+                    break
+            if not colunas[0]:
+                return
+            yield pd.DataFrame(dict(zip(COLUNAS, colunas)))
+    finally:
+        wb.close()
+
+
+def ler_blocos(fonte, nome, linhas=None):
+    """Export (bytes ou caminho) em blocos de `linhas` linhas, com as colunas de `ler_export`.
+
+    Linhas vazias no fim da planilha não são removidas (a limpeza as descarta).
+    """
+    linhas = linhas or BLOCO_LINHAS
+    nome = nome.lower()
+    with _abrir(fonte) as f:
+        if nome.endswith('.csv'):
+            blocos = _blocos_csv(f, linhas)
+        elif nome.endswith('.xlsx'):
+            blocos = _blocos_xlsx(f, linhas)
+        else:
+            blocos = iter([pd.read_excel(f)])
+        # Cada bloco é medido como uma etapa 'leitura' (fora do yield, para
+        # a limpeza do bloco não aparecer como filha da leitura)
+        for i in count():
+            with etapa('leitura', bloco=i) as e:
+                b = next(blocos, None)
+                if b is not None: e.linhas = len(b)
+            if b is None:
+                return
+            yield b
@@ -0,0 +1,159 @@
+"""Limpeza vetorizada do export de inscrições do iweventos.
+
+Reproduz exatamente as regras do processamento original (Colab), mas sem
+callbacks por linha: as transformações de texto rodam sobre os valores
+únicos de cada coluna e o resto usa operações colunares do pandas/numpy.
+"""
+import unicodedata
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+from geografia import REGIAO_UF, resolver_uf
+from medicao import medido
+
+# Mapeamento Rígido (Índices que funcionavam no Colab)
+# 0=Nº Inscrição, 1=Nome, 2=Categoria, 4=Pgto, 5=DtPgto, 9=Situação, 13=DtInscricao, 21=Nasc, 52=UF, 53=País
+INDICES = [0, 1, 2, 4, 5, 9, 13, 21, 52, 53]
+COLUNAS = ['Inscricao', 'Nome', 'Categoria', 'Pgto', 'DataPagamento', 'Situacao', 'DataInscricao', 'Nasc', 'UF', 'Pais']
+
+# Incrementar sempre que INDICES/COLUNAS ou as regras de limpeza mudarem
+MAPEAMENTO_VERSAO = 3
+
+STATUS = ['Pago', 'Cortesia', 'Aberto']
+
+COLUNAS_DATA = ['DataInscricao', 'DataPagamento']
+# Textos que o pd.to_datetime pula ao inferir o formato
+NULOS_DATA = ['', 'nan', 'NaN', 'NAN', 'nat', 'NaT', 'NAT']
+
+# Faixas etárias: (-inf,-1]=N/I, (-1,24]=<25, (24,35], (35,45], (45,55], (55,inf)
+FAIXAS_LIMITES = [-np.inf, -1, 24, 35, 45, 55, np.inf]
+FAIXAS = ["N/I", "< 25 Anos", "25 - 35 Anos", "36 - 45 Anos", "46 - 55 Anos", "> 55 Anos"]
+
+def normalizar(txt):
+    if not isinstance(txt, str): return ""
+    return unicodedata.normalize('NFKD', txt).encode('ASCII', 'ignore').decode('ASCII').upper().strip()
+
+
+def ajustar_categoria(x):
+    return str(x).strip().replace("Equipe Multidisciplinar", "Eq. Multi")
+
+
+def por_unicos(s, func):
+    """Aplica `func` uma vez por valor distinto de `s` e espalha o resultado.
+
+    Colunas como UF, País, Categoria e Pgto têm poucas dezenas de valores
+    distintos mesmo em exports com dezenas de milhares de linhas.
+    """
+    codigos, unicos = pd.factorize(s, use_na_sentinel=False)
+    valores = np.array([func(u) for u in unicos], dtype=object)
+    return pd.Series(valores[codigos] if len(valores) else valores, index=s.index)
+
+
+def mapear_colunas(df):
+    """Seleciona as colunas usadas no relatório. Levanta IndexError se o layout mudou."""
+    if list(df.columns) == COLUNAS:
+        # Já podado e nomeado pela ingestão
+        return df.copy()
+    df_clean = df.iloc[:, INDICES].copy()
+    df_clean.columns = COLUNAS
+    return df_clean
+
+
+def data_nasc(nasc):
+    """Datas de nascimento parseadas (NaT quando inválidas)."""
+    if pd.api.types.is_datetime64_any_dtype(nasc):
+        return nasc
+    # Parse único dd/mm/aaaa sobre os 10 primeiros caracteres
+    dt = pd.to_datetime(nasc.astype(str).str[:10], format="%d/%m/%Y", errors='coerce')
+    if nasc.dtype == object:
+        # Células que o Excel já entregou como datetime (só entre as que falharam)
+        falhas = nasc[dt.isna()]
+        eh_dt = falhas.map(lambda d: isinstance(d, datetime)).astype(bool)
+        if eh_dt.any():
+            dt = dt.copy()
+            dt[falhas.index[eh_dt.to_numpy()]] = pd.to_datetime(falhas[eh_dt], errors='coerce')
+    return dt
+
+
+def calc_idade(nasc, agora=None):
+    """Idade em anos completos (dias // 365); -1 quando a data é inválida."""
+    agora = pd.Timestamp(agora or datetime.now())
+    dias = (agora - data_nasc(nasc)).dt.days
+    return (dias // 365).fillna(-1).astype('int64')
+
+
+def fx_etaria(idade):
+    codigos = pd.cut(idade, FAIXAS_LIMITES, labels=False)
+    return pd.Series(np.array(FAIXAS, dtype=object)[codigos.to_numpy(dtype='int64')], index=idade.index)
+
+
+def classificar(pgto, situacao):
+    cortesia = por_unicos(pgto, lambda x: 'cortesia' in str(x).lower()).astype(bool)
+    pago = por_unicos(situacao, lambda x: 'pago' in str(x).lower()).astype(bool)
+    return pd.Series(np.select([cortesia, pago], ['Cortesia', 'Pago'], 'Aberto').astype(object), index=pgto.index)
+
+
+def formato_data(s):
+    """Formato que pd.to_datetime(dayfirst=True) inferiria para `s`: o do 1º valor
+    não nulo, ou 'mixed' (valor a valor) se ele não é texto com formato reconhecível.
+    None se `s` não tem valor."""
+    ok = (s.notna() & ~s.isin(NULOS_DATA)).to_numpy()
+    if not ok.any():
+        return None
+    v = s.iloc[ok.argmax()]
+    return (guess_datetime_format(v, dayfirst=True) if type(v) is str else None) or 'mixed'
+
+
+def formatos_data(df_clean, formatos=None):
+    """Completa `formatos` com o formato de cada coluna de data, inferido só nas linhas
+    com Nome (as que `limpar` mantém). No modo streaming o formato fica fixado pelo
+    1º bloco que tem datas, como a leitura completa faria para o arquivo todo."""
+    formatos = dict(formatos or {})
+    validas = df_clean['Nome'].notna()
+    for c in COLUNAS_DATA:
+        if c not in formatos:
+            f = formato_data(df_clean.loc[validas, c])
+            if f: formatos[c] = f
+    return formatos
+
+
+def get_regiao(uf):
+    """Região de cada sigla (ver geografia.resolver_uf); 'Outros' se a UF não foi reconhecida."""
+    return por_unicos(uf, lambda u: REGIAO_UF.get(u, "Outros"))
+
+
+@medido('limpeza', linhas=len)
+def limpar(df_clean, formatos=None):
+    """Recebe o resultado de `mapear_colunas` e devolve o `df_clean` do relatório.
+
+    `formatos` ({coluna: formato}, ver formatos_data) fixa o parse das datas;
+    sem ele o pandas infere o formato pela própria coluna.
+    """
+    formatos = formatos or {}
+    df_clean = df_clean.dropna(subset=['Nome'])
+
+    # Sigla da UF (cada texto distinto resolvido uma vez); não reconhecida fica como veio
+    df_clean['UF_Sigla'] = por_unicos(df_clean['UF'], resolver_uf)
+    df_clean['UF'] = df_clean['UF_Sigla'].where(df_clean['UF_Sigla'].notna(), df_clean['UF'])
+    df_clean['Pais'] = por_unicos(df_clean['Pais'], normalizar)
+    df_clean['Categoria'] = por_unicos(df_clean['Categoria'], ajustar_categoria)
+
+    df_clean['IdadeNum'] = calc_idade(df_clean['Nasc'])
+    df_clean['FaixaEtaria'] = fx_etaria(df_clean['IdadeNum'])
+
+    # Classificação Crucial (Corrige o erro do gráfico de evolução)
+    df_clean['Status'] = classificar(df_clean['Pgto'], df_clean['Situacao'])
+
+    # Datas
+    for c in COLUNAS_DATA:
+        df_clean[c] = pd.to_datetime(df_clean[c], dayfirst=True, errors='coerce', format=formatos.get(c))
+
+    # Se pago, usa data pagamento. Se não, usa inscrição.
+    usa_pgto = (df_clean['Status'] == 'Pago') & df_clean['DataPagamento'].notna()
+    df_clean['DataGrafico'] = df_clean['DataPagamento'].where(usa_pgto, df_clean['DataInscricao'])
+
+    df_clean['Regiao'] = get_regiao(df_clean['UF_Sigla'])
+    return df_clean
@@ -0,0 +1,228 @@
+"""Tempo, linhas e pico de memória por etapa do pipeline.
+
+    with medicao.coletar(rotulo='SOBED DAYS 2026') as m:
+        with medicao.etapa('leitura') as e:
+            df = ler_export(dados, nome)
+            e.linhas = len(df)
+    m.etapas   # lista de dicts; cada um também sai como uma linha JSON no logger 'relatorio'
+
+Fora de um `coletar()` as etapas não registram nada e custam só uma consulta
+a um ContextVar. O pico de memória é o VmHWM do processo (Linux), zerado via
+/proc/self/clear_refs no início de cada etapa. Como o reset vale para o
+processo todo, ele só é feito quando nenhuma outra etapa de nível mais alto
+(ex.: outra tarefa da fila) está rodando; uma etapa que se sobrepôs a outra
+sai com `pico_compartilhado: True` e um pico que é só um limite superior
+(o do processo desde o último reset). Para threads de um executor herdarem a medição ativa,
+submeta `propagar(func)` em vez de `func`.
+"""
+import contextvars
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from functools import partial, wraps
+
+try:
+    from pyinstrument import Profiler
+    HAS_PYINSTRUMENT = True
+except ImportError:
+    HAS_PYINSTRUMENT = False
+
+log = logging.getLogger('relatorio')
+LOG_JSON = os.environ.get('RELATORIO_LOG_JSON')
+
+_atual = contextvars.ContextVar('medicao', default=None)
+_pilha = contextvars.ContextVar('medicao_pilha', default=())
+
+# Etapas de nível mais alto em andamento no processo, e quantas já começaram
+_raizes_lock = threading.Lock()
+_raizes = _raizes_iniciadas = 0
+
+
+def _pico_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for l in f:
+                if l.startswith('VmHWM:'):
+                    return int(l.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _zerar_pico():
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+class Etapa:
+    def __init__(self, nome, linhas=None, **extra):
+        self.nome, self.linhas, self.extra = nome, linhas, extra
+        self.segundos = self.pico_mb = None
+        self.compartilhado = False
+
+    def pico(self, mb):
+        if mb is not None and (self.pico_mb is None or mb > self.pico_mb):
+            self.pico_mb = mb
+
+
+class _Nula:
+    """Alvo de `e.linhas = ...` quando não há medição ativa."""
+    linhas = None
+
+
+class Medicao:
+    def __init__(self, rotulo=None):
+        self.rotulo = rotulo
+        self.etapas = []
+        self._lock = threading.Lock()
+
+    def registrar(self, e, pai=None, erro=None):
+        reg = {'ts': datetime.now().isoformat(timespec='milliseconds'), 'execucao': self.rotulo,
+               'etapa': e.nome, 'pai': pai, 'segundos': round(e.segundos, 4), 'linhas': e.linhas,
+               'pico_mb': round(e.pico_mb, 1) if e.pico_mb is not None else None, **e.extra}
+        if e.compartilhado:
+            reg['pico_compartilhado'] = True
+        if erro is not None:
+            reg['erro'] = f"{type(erro).__name__}: {erro}"
+        with self._lock:
+            self.etapas.append(reg)
+        log.info(json.dumps(reg, ensure_ascii=False, default=str))
+
+    def resumo(self):
+        """{etapa: segundos} somando repetições (ex.: um download por edição)."""
+        r = {}
+        for reg in self.etapas:
+            r[reg['etapa']] = r.get(reg['etapa'], 0) + reg['segundos']
+        return r
+
+
+@contextmanager
+def coletar(medicao=None, rotulo=None):
+    m = medicao or Medicao(rotulo)
+    token = _atual.set(m)
+    try:
+        yield m
+    finally:
+        _atual.reset(token)
+
+
+@contextmanager
+def etapa(nome, linhas=None, **extra):
+    m = _atual.get()
+    if m is None:
+        yield _Nula()
+        return
+    pilha = _pilha.get()
+    e = Etapa(nome, linhas, **extra)
+    global _raizes, _raizes_iniciadas
+    raiz = not pilha
+    with _raizes_lock:
+        if raiz:
+            _raizes += 1
+            _raizes_iniciadas += 1
+        sozinha, iniciadas = _raizes == 1, _raizes_iniciadas
+    if sozinha:
+        if pilha:
+            # O pico do pai até aqui se perderia com o reset abaixo
+            pilha[-1].pico(_pico_mb())
+        medir_pico = _zerar_pico()
+    else:
+        # Zerar apagaria o pico das etapas das outras threads
+        medir_pico = _pico_mb() is not None
+    token = _pilha.set(pilha + (e,))
+    inicio = time.perf_counter()
+    erro = None
+    try:
+        yield e
+    except BaseException as ex:
+        erro = ex
+        raise
+    finally:
+        e.segundos = time.perf_counter() - inicio
+        _pilha.reset(token)
+        with _raizes_lock:
+            if raiz:
+                _raizes -= 1
+            e.compartilhado = not sozinha or _raizes_iniciadas != iniciadas
+        if medir_pico:
+            e.pico(_pico_mb())
+        if pilha:
+            pilha[-1].pico(e.pico_mb)
+        m.registrar(e, pilha[-1].nome if pilha else None, erro)
+
+
+def medido(nome, linhas=None):
+    """Decorador: mede a função como uma etapa; `linhas(resultado)` dá o nº de linhas."""
+    def deco(func):
+        @wraps(func)
+        def f(*args, **kwargs):
+            if _atual.get() is None:
+                return func(*args, **kwargs)
+            with etapa(nome) as e:
+                r = func(*args, **kwargs)
+                if linhas: e.linhas = linhas(r)
+                return r
+        return f
+    return deco
+
+
+def propagar(func):
+    """`func` rodando no contexto (medição ativa) de quem chamou, para ex.submit."""
+    return partial(contextvars.copy_context().run, func)
+
+
+def configurar_log(destino=LOG_JSON):
+    """Uma linha JSON por etapa em `destino` (arquivo, ou '-' para stderr)."""
+    if not destino or any(getattr(h, '_medicao', False) for h in log.handlers):
+        return
+    h = logging.StreamHandler() if destino == '-' else logging.FileHandler(destino, encoding='utf-8')
+    h._medicao = True
+    h.setFormatter(logging.Formatter('%(message)s'))
+    log.addHandler(h)
+    log.setLevel(logging.INFO)
+
+
+class Perfil:
+    def __init__(self, destino=None):
+        self.destino = destino
+        self.texto = ''
+
+
+@contextmanager
+def perfil(destino=None, linhas=40):
+    """Perfila o trecho (só a thread atual). Com pyinstrument e destino .html, gera o HTML
+    dele; senão cProfile, com `.texto` (top por tempo acumulado) e o .prof em `destino`."""
+    p = Perfil(destino)
+    if HAS_PYINSTRUMENT and destino and destino.endswith('.html'):
+        prof = Profiler()
+        prof.start()
+        try:
+            yield p
+        finally:
+            prof.stop()
+            p.texto = prof.output_text()
+            with open(destino, 'w', encoding='utf-8') as f:
+                f.write(prof.output_html())
+        return
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield p
+    finally:
+        prof.disable()
+        if destino:
+            prof.dump_stats(destino)
+        s = io.StringIO()
+        pstats.Stats(prof, stream=s).sort_stats('cumulative').print_stats(linhas)
+        p.texto = s.getvalue()
@@ -0,0 +1,168 @@
+"""Servidor HTTP falso do iweventos.com.br para testar o robô offline.
+
+Imita a tela de login (/sistema/not/acesso/login) e a tela do relatório
+(/sistema/{edicao}/relinscricoesexcel/inscricoes), que devolve um CSV
+sintético no layout de 54 colunas. Edições em `servidor.erro_export`
+devolvem uma página HTML de erro no lugar do export. O subdomínio vira o
+primeiro trecho do caminho:
+
+    python mock_iweventos.py --porta 8765
+    IWEVENTOS_URL_BASE=http://127.0.0.1:8765/{subdominio} streamlit run app.py
+"""
+import argparse
+import csv
+import io
+import random
+import re
+import secrets
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from limpeza import INDICES
+
+RE_LOGIN = re.compile(r'^/(?P<sub>[^/]+)/sistema/not/acesso/login/?$')
+RE_RELATORIO = re.compile(r'^/(?P<sub>[^/]+)/sistema/(?P<edicao>[^/]+)/relinscricoesexcel/inscricoes/?$')
+
+PAGINA_LOGIN = """<!DOCTYPE html><html><body>
+<form method="post" action="{acao}">
+  <input type="text" name="login" id="login">
+  <input type="password" name="senha" id="senha">
+  <button type="submit" id="btnEntrar">Entrar</button>
+</form>{erro}</body></html>"""
+
+PAGINA_RELATORIO = """<!DOCTYPE html><html><body>
+<form method="post" action="{acao}">
+{checkboxes}
+  <select name="formato"><option value="xlsx">Excel</option><option value="csv" selected>CSV</option></select>
+  <textarea name="colunas">
+todas</textarea>
+  <button type="submit" id="btGerar" name="gerar" value="1">Gerar</button>
+</form></body></html>"""
+
+PAGINA_ERRO = """<!DOCTYPE html><html><body><p>Não foi possível gerar o relatório.</p></body></html>"""
+
+AGRUPADORES = ['inscricao', 'dados_pessoais', 'dados_contato', 'dados_complementares',
+               'dados_correspondencia', 'transporte_ida', 'transporte_volta', 'hospedagem', 'cobranca']
+
+CATEGORIAS = ['Médico', 'Residente', 'Equipe Multidisciplinar', 'Estudante']
+PAGAMENTOS = ['Cartão', 'Boleto', 'Pix', 'Cortesia']
+SITUACOES = ['Pago', 'Aguardando pagamento', 'Cancelado']
+UFS = ['SP', 'RJ', 'MG', 'PR', 'BA', 'PE', 'DF', 'RS', 'SC', 'CE']
+
+
+def gerar_csv(edicao, linhas):
+    """CSV sintético e determinístico por edição, com as colunas usadas pelo relatório."""
+    rnd = random.Random(edicao)
+    out = io.StringIO()
+    w = csv.writer(out)
+    w.writerow([f'Coluna {i}' for i in range(54)])
+    inicio = date(2025, 1, 1)
+    for n in range(linhas):
+        insc = inicio + timedelta(days=rnd.randrange(300))
+        pago = rnd.choice(SITUACOES)
+        campos = [''] * 54
+        valores = [str(100000 + n), f'Inscrito {n}', rnd.choice(CATEGORIAS), rnd.choice(PAGAMENTOS),
+                   (insc + timedelta(days=rnd.randrange(15))).strftime('%d/%m/%Y') if pago == 'Pago' else '',
+                   pago, insc.strftime('%d/%m/%Y %H:%M'),
+                   (date(1950, 1, 1) + timedelta(days=rnd.randrange(20000))).strftime('%d/%m/%Y'),
+                   rnd.choice(UFS), 'Brasil' if rnd.random() < .95 else 'Portugal']
+        for i, v in zip(INDICES, valores):
+            campos[i] = v
+        w.writerow(campos)
+    return out.getvalue().encode('utf-8')
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _sessao_ok(self):
+        cookie = self.headers.get('Cookie', '')
+        m = re.search(r'PHPSESSID=([^;]+)', cookie)
+        return bool(m) and m.group(1) in self.server.sessoes
+
+    def _responder(self, codigo, corpo=b'', tipo='text/html; charset=utf-8', cabecalhos=()):
+        self.send_response(codigo)
+        self.send_header('Content-Type', tipo)
+        self.send_header('Content-Length', str(len(corpo)))
+        for k, v in cabecalhos:
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _redirecionar(self, destino, cabecalhos=()):
+        self._responder(302, cabecalhos=[('Location', destino), *cabecalhos])
+
+    def _form(self):
+        tamanho = int(self.headers.get('Content-Length') or 0)
+        return parse_qs(self.rfile.read(tamanho).decode('utf-8'))
+
+    def do_GET(self):
+        caminho = self.path.split('?')[0]
+        if m := RE_LOGIN.match(caminho):
+            return self._responder(200, PAGINA_LOGIN.format(acao=caminho, erro='').encode())
+        if m := RE_RELATORIO.match(caminho):
+            if not self._sessao_ok():
+                return self._redirecionar(f"/{m['sub']}/sistema/not/acesso/login")
+            checkboxes = '\n'.join(
+                f'  <input type="checkbox" class="agrupador_{a}" name="agrupador[]" value="{a}">'
+                for a in AGRUPADORES)
+            return self._responder(200, PAGINA_RELATORIO.format(acao=caminho, checkboxes=checkboxes).encode())
+        if re.match(r'^/[^/]+/sistema/?$', caminho):
+            return self._responder(200, b'<html><body>Painel</body></html>')
+        self._responder(404, b'not found')
+
+    def do_POST(self):
+        caminho = self.path.split('?')[0]
+        form = self._form()
+        if m := RE_LOGIN.match(caminho):
+            usuario = form.get('login', [''])[0]
+            senha = form.get('senha', [''])[0]
+            if (usuario, senha) != (self.server.usuario, self.server.senha):
+                return self._responder(200, PAGINA_LOGIN.format(acao=caminho, erro='<p>Login inválido</p>').encode())
+            token = secrets.token_hex(8)
+            self.server.sessoes.add(token)
+            return self._redirecionar(f"/{m['sub']}/sistema/", [('Set-Cookie', f'PHPSESSID={token}; Path=/')])
+        if m := RE_RELATORIO.match(caminho):
+            if not self._sessao_ok():
+                return self._redirecionar(f"/{m['sub']}/sistema/not/acesso/login")
+            time.sleep(self.server.atraso)
+            # Como o site, só gera o export com o formulário completo
+            completo = form.get('formato') == ['csv'] and form.get('colunas') == ['todas']
+            if m['edicao'] in self.server.erro_export or not completo:
+                return self._responder(200, PAGINA_ERRO.encode())
+            corpo = gerar_csv(m['edicao'], self.server.linhas)
+            return self._responder(200, corpo, 'text/csv; charset=utf-8', [
+                ('Content-Disposition', f"attachment; filename=inscricoes_{m['edicao']}.csv")])
+        self._responder(404, b'not found')
+
+
+def iniciar(porta=0, usuario='teste', senha='teste', linhas=500, atraso=0.0):
+    """Sobe o servidor numa thread. Devolve (servidor, url_base com {subdominio})."""
+    servidor = ThreadingHTTPServer(('127.0.0.1', porta), Handler)
+    servidor.daemon_threads = True
+    servidor.sessoes = set()
+    servidor.usuario, servidor.senha = usuario, senha
+    servidor.linhas, servidor.atraso = linhas, atraso
+    servidor.erro_export = set()
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f'http://127.0.0.1:{servidor.server_address[1]}/{{subdominio}}'
+
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument('--porta', type=int, default=8765)
+    p.add_argument('--usuario', default='teste')
+    p.add_argument('--senha', default='teste')
+    p.add_argument('--linhas', type=int, default=500)
+    p.add_argument('--atraso', type=float, default=0.0, help='segundos antes de devolver o export')
+    a = p.parse_args()
+    servidor, base = iniciar(a.porta, a.usuario, a.senha, a.linhas, a.atraso)
+    print(f'IWEVENTOS_URL_BASE={base}')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.shutdown()
@@ -0,0 +1,119 @@
+"""Detecção de fim de download numa pasta isolada.
+
+Usa inotify (via watchdog, que já vem com o Streamlit) para acordar assim
+que o Chromium cria ou renomeia arquivos; sem watchdog, cai para polling de
+`os.stat` em intervalos curtos. O arquivo é considerado pronto quando não há
+mais parcial (.crdownload) na pasta e ele foi renomeado a partir do parcial
+ou tem tamanho estável.
+"""
+import os
+import threading
+import time
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+    HAS_WATCHDOG = True
+except ImportError:
+    HAS_WATCHDOG = False
+
+EXTENSOES = ('.xlsx', '.xls', '.csv')
+PARCIAIS = ('.crdownload', '.part', '.tmp')
+INTERVALO = 0.05  # polling fino (sem inotify ou enquanto confirma estabilidade)
+ESTAVEL = 0.2     # tempo com tamanho/mtime inalterados para aceitar o arquivo
+
+
+class _Notificador(FileSystemEventHandler if HAS_WATCHDOG else object):
+    def __init__(self, evento, renomeados):
+        self.evento = evento
+        self.renomeados = renomeados
+
+    def on_any_event(self, event):
+        if event.event_type == 'moved':
+            # Chromium: "x.xlsx.crdownload" -> "x.xlsx" é o fim do download
+            self.renomeados.add(os.path.basename(event.dest_path))
+        self.evento.set()
+
+
+class MonitorDownload:
+    """Context manager: abra antes de disparar o download e chame `esperar`.
+
+        with MonitorDownload(pasta) as monitor:
+            driver.execute_script("document.getElementById('btGerar').click();")
+            caminho = monitor.esperar(60)
+        monitor.segundos, monitor.modo
+    """
+
+    def __init__(self, pasta, extensoes=EXTENSOES, intervalo=INTERVALO, estavel=ESTAVEL, usar_inotify=True):
+        self.pasta = pasta
+        self.extensoes = extensoes
+        self.intervalo = intervalo
+        self.estavel = estavel
+        self.modo = 'inotify' if (usar_inotify and HAS_WATCHDOG) else 'polling'
+        self.segundos = None
+        self._evento = threading.Event()
+        self._renomeados = set()
+        self._observer = None
+        self._inicio = None
+        self._existentes = set()
+        self._parcial_visto = False
+
+    def __enter__(self):
+        self._inicio = time.monotonic()
+        # Arquivos que já estavam na pasta nunca são o download
+        self._existentes = set(os.listdir(self.pasta))
+        if self.modo == 'inotify':
+            try:
+                self._observer = Observer()
+                self._observer.schedule(_Notificador(self._evento, self._renomeados), self.pasta)
+                self._observer.start()
+            except OSError:
+                # Limite de watches do inotify esgotado, por exemplo
+                self._observer = None
+                self.modo = 'polling'
+        return self
+
+    def __exit__(self, *exc):
+        if self._observer:
+            self._observer.stop()
+            self._observer.join(timeout=1)
+            self._observer = None
+
+    def _candidato(self):
+        """(nome, tamanho, mtime) do export, ou None se ainda há parcial/nada."""
+        nomes = [n for n in os.listdir(self.pasta) if n not in self._existentes]
+        if any(n.endswith(PARCIAIS) for n in nomes):
+            self._parcial_visto = True
+            return None
+        estados = []
+        for n in nomes:
+            if n.lower().endswith(self.extensoes):
+                try: st = os.stat(os.path.join(self.pasta, n))
+                except FileNotFoundError: continue
+                estados.append((n, st.st_size, st.st_mtime_ns))
+        return max(estados, key=lambda e: e[2]) if estados else None
+
+    def esperar(self, timeout):
+        """Devolve o caminho do arquivo assim que estiver completo; TimeoutError se não vier."""
+        limite = time.monotonic() + timeout
+        ultimo, desde = None, None
+        while True:
+            self._evento.clear()
+            agora = time.monotonic()
+            cand = self._candidato()
+            if cand and cand[1] > 0:
+                # Parcial que sumiu = rename concluído, mesmo sem inotify
+                renomeado = cand[0] in self._renomeados or self._parcial_visto
+                if renomeado or (cand == ultimo and agora - desde >= self.estavel):
+                    self.segundos = agora - self._inicio
+                    return os.path.join(self.pasta, cand[0])
+                if cand != ultimo:
+                    ultimo, desde = cand, agora
+            if agora >= limite:
+                raise TimeoutError("Download não finalizado.")
+            # Com inotify dorme até o próximo evento; o teto de 1 s cobre eventos perdidos
+            if self._observer and not ultimo:
+                espera = 1.0
+            else:
+                espera = self.intervalo
+            self._evento.wait(min(espera, max(limite - agora, 0)))
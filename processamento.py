@@ -0,0 +1,239 @@
+"""Geração do relatório sem interface: API Python e linha de comando.
+
+O app Streamlit e o modo em lote usam as mesmas funções. Em lote, cada
+export é processado num processo separado (leitura, limpeza, gráficos e
+WeasyPrint são CPU-bound e não se beneficiam de threads):
+
+    python processamento.py exports/*.xlsx --ano 2026 --saida pdfs/
+    python processamento.py --manifesto eventos.csv --processos 8 --incremental
+    python processamento.py export_gigante.csv --streaming
+
+O manifesto é um CSV com as colunas arquivo, evento e ano (separador , ou ;)
+e, opcionalmente, id: o identificador estável do evento para o snapshot do
+--incremental (padrão: o nome do arquivo sem extensão). Sem manifesto, o
+evento é o nome do arquivo (ou --evento) e o ano vem de --ano.
+Com --streaming o export é lido do disco em blocos e só as contagens ficam
+em memória (ver agregados_blocos).
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+
+import cache
+import medicao
+import snapshot
+from agregacao import agregar, contagens, dimensoes, montar, somar
+import graficos
+from graficos import grafico_evolucao, grafico_idade, grafico_regiao
+from ingestao import ler_blocos, ler_export
+from limpeza import MAPEAMENTO_VERSAO, formatos_data, limpar, mapear_colunas
+
+Job = namedtuple('Job', ['arquivo', 'evento', 'ano', 'id'], defaults=[None])
+Resultado = namedtuple('Resultado', ['job', 'saida', 'erro', 'segundos', 'resumo', 'etapas'], defaults=[None, ()])
+
+
+def aquecer():
+    """Prepara gráficos e WeasyPrint (fontes, estilos) para o primeiro relatório sair rápido."""
+    import relatorio
+    with medicao.etapa('aquecimento'):
+        graficos.aquecer()
+        relatorio.aquecer()
+
+
+def nome_pdf(evento, ano):
+    return f"Relatorio_{evento.replace(' ', '_')}_{ano}.pdf"
+
+
+def nomes_pdf(jobs):
+    """Nome do PDF de cada job; evento/ano repetido no lote leva também o nome do export."""
+    nomes = [nome_pdf(j.evento, j.ano) for j in jobs]
+    repetidos = {n for n in nomes if nomes.count(n) > 1}
+    nomes = [n[:-4] + '_' + os.path.splitext(os.path.basename(j.arquivo))[0].replace(' ', '_') + '.pdf'
+             if n in repetidos else n for n, j in zip(nomes, jobs)]
+    # Mesmo nome de export em pastas diferentes: numera
+    vistos = {}
+    for i, n in enumerate(nomes):
+        vistos[n] = vistos.get(n, 0) + 1
+        if vistos[n] > 1:
+            nomes[i] = f"{n[:-4]}_{vistos[n]}.pdf"
+    return nomes
+
+
+def data_relatorio():
+    """Agora no horário de Brasília, como aparece no cabeçalho."""
+    return (datetime.utcnow() - timedelta(hours=3)).strftime('%d/%m/%Y %H:%M')
+
+
+def agregados(df, chave_bruto=None, id_evento=None, aviso=None):
+    """Export bruto -> (Agregados, resumo do incremental ou None).
+
+    Com `id_evento`, atualiza o snapshot desse evento (ver snapshot.py) em vez
+    de limpar o export inteiro. `aviso` recebe mensagens para o usuário (ex.:
+    st.warning).
+    """
+    chave_bruto = chave_bruto or cache.hash_obj(df)
+    # Idade e faixa etária dependem de hoje: resultado de outro dia não serve
+    hoje = datetime.now().date()
+    try:
+        if id_evento:
+            cont, resumo = cache.memo('limpeza', ('snapshot', chave_bruto, id_evento, hoje, MAPEAMENTO_VERSAO),
+                                      lambda: snapshot.atualizar(id_evento, df))
+            return montar(cont), resumo
+        df_clean = cache.memo('limpeza', (chave_bruto, hoje, MAPEAMENTO_VERSAO), lambda: limpar(mapear_colunas(df)))
+    except IndexError:
+        if aviso: aviso("Tentando mapeamento alternativo de colunas...")
+        # Fallback se as colunas mudaram
+        df_clean = limpar(df.copy()) # Lógica simplificada de fallback
+    return agregar(df_clean), None
+
+
+def agregados_blocos(blocos, aviso=None):
+    """Modo streaming: cada bloco é limpo e reduzido a contagens, somadas às
+    anteriores e descartado. Mesmo resultado de `agregados` sobre o export inteiro."""
+    cont, avisado, formatos = None, False, {}
+    for b in blocos:
+        try:
+            b_map = mapear_colunas(b)
+            formatos = formatos_data(b_map, formatos)
+            limpo = limpar(b_map, formatos)
+            del b_map
+        except IndexError:
+            if aviso and not avisado: aviso("Tentando mapeamento alternativo de colunas...")
+            avisado = True
+            limpo = limpar(b.copy())
+        del b
+        with medicao.etapa('agregacao', linhas=len(limpo)):
+            parte = contagens(dimensoes(limpo))
+            del limpo
+            cont = parte if cont is None else somar([cont, parte])
+    return montar(cont)
+
+
+def pdf_relatorio(evento, ano, ag, d_str=None):
+    """PDF final a partir dos agregados. Gráficos e PDF passam pelo cache."""
+    # WeasyPrint (e suas bibliotecas nativas) só quando um PDF é de fato gerado
+    from relatorio import gerar_pdf, montar_html
+    # Cada gráfico é cacheado pelo hash dos seus próprios agregados
+    img_reg = cache.memo('graficos', ('regiao', cache.hash_obj(ag.d_reg)), lambda: grafico_regiao(ag.d_reg))
+    img_id = cache.memo('graficos', ('idade', cache.hash_obj(ag.d_id)), lambda: grafico_idade(ag.d_id))
+    img_evo = cache.memo('graficos', ('evolucao', cache.hash_obj(ag.df_evo)), lambda: grafico_evolucao(ag.df_evo))
+    html = montar_html(evento, ano, d_str or data_relatorio(), ag.kpis, img_evo, img_reg, img_id,
+                       ag.tb_cat, ag.tb_pais, ag.tb_uf)
+    return cache.memo('pdf', cache.hash_bytes(html.encode('utf-8')),
+                      lambda: gerar_pdf(html, (img_evo, img_reg, img_id)))
+
+
+def gerar(dados, nome, evento, ano, id_evento=None, streaming=False):
+    """Bytes (ou caminho, em streaming) do export -> (bytes do PDF, resumo do incremental ou None).
+
+    `id_evento` liga a atualização incremental (ignorada em streaming)."""
+    if streaming:
+        return pdf_relatorio(evento, ano, agregados_blocos(ler_blocos(dados, nome))), None
+    chave = cache.hash_bytes(dados)
+    df = cache.memo('leitura', chave, lambda: ler_export(dados, nome))
+    ag, resumo = agregados(df, chave, id_evento)
+    return pdf_relatorio(evento, ano, ag), resumo
+
+
+def relatorio_app(chave_bruto, upload, evento, ano, id_evento=None, streaming=False, perfilar=False):
+    """Etapa CPU-bound do relatório do app, feita num processo da fila (fila.Tarefa.em_processo).
+
+    Recebe o export como (bytes, nome) e devolve (bytes do PDF, resumo do
+    incremental ou None, avisos, texto do perfil ou None).
+    """
+    avisos = []
+    with medicao.perfil() if perfilar else nullcontext() as prof:
+        if streaming:
+            hoje = datetime.now().date()
+            ag, resumo = cache.memo('limpeza', ('blocos', chave_bruto, hoje, MAPEAMENTO_VERSAO),
+                                    lambda: agregados_blocos(ler_blocos(*upload), aviso=avisos.append)), None
+        else:
+            df = cache.memo('leitura', chave_bruto, lambda: ler_export(*upload))
+            ag, resumo = agregados(df, chave_bruto, id_evento, aviso=avisos.append)
+        pdf = pdf_relatorio(evento, ano, ag)
+    return pdf, resumo, avisos, prof.texto if perfilar else None
+
+
+def _executar(job, saida, incremental, streaming=False):
+    inicio = time.monotonic()
+    with medicao.coletar(rotulo=f"{job.evento} {job.ano}") as m:
+        try:
+            if streaming:
+                dados = job.arquivo
+            else:
+                with open(job.arquivo, 'rb') as f:
+                    dados = f.read()
+            nome = os.path.basename(job.arquivo)
+            id_evento = (job.id or os.path.splitext(nome)[0]) if incremental else None
+            conteudo, resumo = gerar(dados, nome, job.evento, job.ano, id_evento, streaming)
+            with open(saida, 'wb') as f:
+                f.write(conteudo)
+            return Resultado(job, saida, None, time.monotonic() - inicio, resumo, m.etapas)
+        except Exception as e:
+            return Resultado(job, None, e, time.monotonic() - inicio, None, m.etapas)
+
+
+def gerar_lote(jobs, pasta_saida='.', processos=None, incremental=False, streaming=False):
+    """Gera os PDFs em paralelo (um processo por núcleo); devolve os resultados conforme terminam."""
+    os.makedirs(pasta_saida, exist_ok=True)
+    jobs = list(jobs)
+    saidas = [os.path.join(pasta_saida, n) for n in nomes_pdf(jobs)]
+    if len(jobs) == 1 or processos == 1:
+        for j, saida in zip(jobs, saidas):
+            yield _executar(j, saida, incremental, streaming)
+        return
+    with ProcessPoolExecutor(max_workers=min(processos or os.cpu_count() or 1, len(jobs))) as ex:
+        futuros = [ex.submit(_executar, j, saida, incremental, streaming) for j, saida in zip(jobs, saidas)]
+        for f in as_completed(futuros):
+            yield f.result()
+
+
+def ler_manifesto(caminho):
+    with open(caminho, newline='', encoding='utf-8-sig') as f:
+        amostra = f.read(4096); f.seek(0)
+        leitor = csv.DictReader(f, dialect=csv.Sniffer().sniff(amostra, delimiters=',;'))
+        base = os.path.dirname(os.path.abspath(caminho))
+        return [Job(os.path.join(base, l['arquivo']), l['evento'], l['ano'], l.get('id') or None) for l in leitor]
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Gera os PDFs do relatório de eventos sem a interface.")
+    p.add_argument('arquivos', nargs='*', help='exports (.xlsx/.csv)')
+    p.add_argument('--manifesto', help='CSV com as colunas arquivo, evento, ano')
+    p.add_argument('--evento', help='título do evento (padrão: nome do arquivo)')
+    p.add_argument('--ano', default=str(datetime.now().year))
+    p.add_argument('--saida', default='.', help='pasta dos PDFs')
+    p.add_argument('--processos', type=int, default=None, help='padrão: nº de núcleos')
+    p.add_argument('--incremental', action='store_true', help='usa/atualiza o snapshot de cada evento (coluna id do manifesto ou nome do arquivo)')
+    p.add_argument('--streaming', action='store_true', help='lê cada export em blocos (memória limitada ao bloco); ignora --incremental')
+    p.add_argument('--log-json', default=medicao.LOG_JSON, help="etapas em JSON, uma por linha (arquivo ou '-')")
+    p.add_argument('--perfil', help='grava o perfil (.prof do cProfile, ou .html com pyinstrument); roda sem paralelismo')
+    a = p.parse_args(argv)
+    medicao.configurar_log(a.log_json)
+
+    jobs = ler_manifesto(a.manifesto) if a.manifesto else []
+    jobs += [Job(arq, a.evento or os.path.splitext(os.path.basename(arq))[0], a.ano) for arq in a.arquivos]
+    if not jobs:
+        p.error("informe arquivos ou --manifesto")
+
+    inicio, falhas = time.monotonic(), 0
+    with medicao.perfil(a.perfil) if a.perfil else nullcontext():
+        for r in gerar_lote(jobs, a.saida, 1 if a.perfil else a.processos, a.incremental and not a.streaming, a.streaming):
+            if r.erro:
+                falhas += 1
+                print(f"ERRO {r.job.arquivo}: {r.erro}", file=sys.stderr)
+            else:
+                etapas = ' '.join(f"{e['etapa']} {e['segundos']:.2f}" for e in r.etapas)
+                print(f"ok   {r.saida} ({r.segundos:.1f}s: {etapas})")
+    print(f"{len(jobs) - falhas}/{len(jobs)} relatórios em {time.monotonic() - inicio:.1f}s")
+    return 1 if falhas else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""Montagem do HTML do relatório e renderização do PDF (WeasyPrint).
+
+Os gráficos não vão em base64 no HTML: o <img> aponta para `mem:<hash>` e o
+WeasyPrint busca os bytes direto da memória (ver Recursos).
+"""
+import os
+from functools import lru_cache
+from io import BytesIO
+
+from jinja2 import Environment
+from weasyprint import CSS, HTML
+from weasyprint.urls import URLFetcher, URLFetcherResponse
+
+from cache import hash_bytes
+from medicao import etapa, medido
+
+
+# Tabelas longas (milhares de cidades/categorias) são cortadas aqui
+MAX_LINHAS = int(os.environ.get('RELATORIO_MAX_LINHAS', 40))
+
+
+class Recursos(URLFetcher):
+    """Serve as imagens `mem:` da memória; outras URLs seguem o fetcher padrão."""
+
+    def __init__(self, imagens):
+        super().__init__()
+        self.imagens = {url_imagem(i): i for i in imagens}
+
+    def fetch(self, url, headers=None):
+        img = self.imagens.get(url)
+        if img is None:
+            return super().fetch(url, headers)
+        return URLFetcherResponse(url, img.dados, {'Content-Type': img.mime})
+
+
+def url_imagem(img):
+    # Nome pelo conteúdo: o hash do HTML continua identificando o PDF inteiro
+    return f"mem:{hash_bytes(img.dados)}"
+
+
+def linhas(df, max_linhas=MAX_LINHAS):
+    """Linhas prontas para o template; além de `max_linhas`, o resto vira uma linha só."""
+    nomes = df.index.astype(str)
+    nomes = [n[:40] if n != 'nan' else "N/I" for n in nomes[:max_linhas]]
+    cols = [df[c].to_numpy() for c in ('Total', 'Pago', 'Cortesia', 'Aberto')]
+    r = list(zip(nomes, *(c[:max_linhas].tolist() for c in cols)))
+    resto = len(df) - max_linhas
+    if resto > 0:
+        r.append((f"Demais ({resto})", *(int(c[max_linhas:].sum()) for c in cols)))
+    return r
+
+
+# CSS Completo (Restaurado do Colab Original)
+ESTILO = """
+@page { size: A4; margin: 1cm; }
+body { font-family: Helvetica, sans-serif; margin: 0; color: #333; background: #fff; }
+.head { padding: 15px 0; border-bottom: 2px solid #eee; margin-bottom: 20px; }
+.tit { font-size: 24px; font-weight: 700; color: #333; }
+.meta { font-size: 11px; color: #777; margin-top: 5px; }
+
+.kpi-row { display: flex; justify-content: space-between; gap: 10px; margin-bottom: 25px; }
+.kpi { width: 23%; padding: 15px 5px; border-radius: 8px; color: white; text-align: center; }
+.kl { font-size: 10px; font-weight: bold; text-transform: uppercase; margin-bottom: 5px; opacity: 0.9; }
+.kv { font-size: 32px; font-weight: 800; }
+
+.card { border: 1px solid #e0e0e0; border-radius: 8px; margin-bottom: 20px; page-break-inside: avoid; background: #fff; }
+.ch { padding: 12px 15px; border-bottom: 1px solid #eee; background: #f8f9fa; }
+.ch h3 { margin: 0; font-size: 14px; color: #444; text-transform: uppercase; font-weight: 700; }
+.cb { padding: 15px; text-align: center; }
+
+.row { display: flex; gap: 15px; margin-bottom: 10px; }
+.col { width: 48%; }
+.img { width: 100%; max-height: 280px; object-fit: contain; }
+
+.dt { width: 100%; border-collapse: collapse; font-size: 11px; }
+.dt th { background: #f8f9fa; padding: 8px; text-align: left; border-bottom: 2px solid #ddd; color: #555; }
+.dt td { padding: 6px 8px; border-bottom: 1px solid #eee; color: #444; }
+.dt tr:nth-child(even) { background: #fafafa; }
+.n { text-align: right; width: 45px; }
+.b { font-weight: bold; background: #f0f0f0; }
+.g { color: #27ae60; font-weight: bold; }
+.o { color: #d35400; font-weight: bold; }
+.r { color: #c0392b; font-weight: bold; }
+"""
+
+
+# --- GERAÇÃO HTML/PDF (VISUAL PREMIUM RESTAURADO) ---
+# Compilado uma vez no import; o CSS vai à parte, como folha já parseada
+TEMPLATE = Environment(autoescape=True, trim_blocks=True).from_string("""{% macro tabela(rows, titulo) -%}
+<table class="dt"><thead><tr><th>{{ titulo }}</th><th class="n">Total</th><th class="n">Pagos</th><th class="n">Cort.</th><th class="n">Aberto</th></tr></thead><tbody>
+{%- for nm, tot, pg, cr, ab in rows %}
+<tr><td>{{ nm }}</td><td class="n b">{{ tot }}</td><td class="n g">{{ pg }}</td><td class="n o">{{ cr }}</td><td class="n r">{{ ab }}</td></tr>
+{%- endfor %}
+</tbody></table>
+{%- endmacro %}
+<!DOCTYPE html><html><head><meta charset="utf-8"></head><body>
+<div class="head">
+    <div class="tit">Relatório - {{ con_event }} {{ con_year }}</div>
+    <div class="meta">Gerado em: {{ d_str }} (Horário de Brasília)</div>
+</div>
+
+<div class="kpi-row">
+    <div class="kpi" style="background:#3498db"><div class="kl">Total Inscritos</div><div class="kv">{{ tot }}</div></div>
+    <div class="kpi" style="background:#27ae60"><div class="kl">Pagos Confirmados</div><div class="kv">{{ pg }}</div></div>
+    <div class="kpi" style="background:#f39c12"><div class="kl">Cortesias</div><div class="kv">{{ cr }}</div></div>
+    <div class="kpi" style="background:#c0392b"><div class="kl">Em Aberto</div><div class="kv">{{ ab }}</div></div>
+</div>
+
+<div class="card">
+    <div class="ch"><h3>Evolução Semanal das Inscrições</h3></div>
+    <div class="cb"><img src="{{ img_evo }}" style="width:100%"></div>
+</div>
+
+<div class="row">
+    <div class="col card">
+        <div class="ch"><h3>Distribuição por Região</h3></div>
+        <div class="cb"><img src="{{ img_reg }}" class="img"></div>
+    </div>
+    <div class="col card">
+        <div class="ch"><h3>Perfil Etário</h3></div>
+        <div class="cb"><img src="{{ img_id }}" class="img"></div>
+    </div>
+</div>
+
+<div class="card">
+    <div class="ch"><h3>Detalhamento por Categoria</h3></div>
+    <div class="cb" style="text-align:left;padding:0">{{ tabela(tb_cat, 'Categoria') }}</div>
+</div>
+
+<div class="row">
+    <div class="col card">
+        <div class="ch"><h3>Detalhamento por País</h3></div>
+        <div class="cb" style="text-align:left;padding:0">{{ tabela(tb_pais, 'País') }}</div>
+    </div>
+    <div class="col card">
+        <div class="ch"><h3>Detalhamento por Estado (Brasil)</h3></div>
+        <div class="cb" style="text-align:left;padding:0">{{ tabela(tb_uf, 'Estado') }}</div>
+    </div>
+</div>
+</body></html>""")
+
+
+@lru_cache(maxsize=None)
+def folha_estilo():
+    return CSS(string=ESTILO)
+
+
+@medido('html')
+def montar_html(con_event, con_year, d_str, kpis, img_evo, img_reg, img_id, tb_cat, tb_pais, tb_uf):
+    tot, pg, cr, ab = kpis
+    return TEMPLATE.render(
+        con_event=con_event, con_year=con_year, d_str=d_str, tot=tot, pg=pg, cr=cr, ab=ab,
+        img_evo=url_imagem(img_evo), img_reg=url_imagem(img_reg), img_id=url_imagem(img_id),
+        tb_cat=linhas(tb_cat), tb_pais=linhas(tb_pais), tb_uf=linhas(tb_uf))
+
+
+def aquecer():
+    """Configuração de fontes do WeasyPrint (fontconfig/Pango) e CSS do relatório,
+    carregados uma vez no processo em vez de no primeiro PDF."""
+    HTML(string='<div class="head"><div class="tit">.</div></div>').render(stylesheets=[folha_estilo()])
+
+
+def gerar_pdf(html, imagens=()):
+    with etapa('layout'):
+        doc = HTML(string=html, url_fetcher=Recursos(imagens)).render(stylesheets=[folha_estilo()])
+    with etapa('escrita', paginas=len(doc.pages)):
+        pdf_io = BytesIO()
+        doc.write_pdf(pdf_io)
+    return pdf_io.getvalue()
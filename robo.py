@@ -0,0 +1,242 @@
+"""Robô de download do relatório de inscrições do iweventos (Selenium).
+
+Os navegadores headless ficam num pool limitado e são reaproveitados entre
+downloads e reruns do Streamlit; cada download usa sua própria pasta
+temporária. Para testar offline, aponte IWEVENTOS_URL_BASE para o
+mock_iweventos.py (ex.: http://127.0.0.1:8765/{subdominio}).
+"""
+import atexit
+import hashlib
+import os
+import queue
+import re
+import shutil
+import tempfile
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+
+import medicao
+from monitor_download import MonitorDownload
+
+# Tenta importar Selenium (Necessário para o Robô)
+try:
+    from selenium import webdriver
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    HAS_SELENIUM = True
+except ImportError:
+    HAS_SELENIUM = False
+
+URL_BASE = os.environ.get('IWEVENTOS_URL_BASE', 'https://{subdominio}.iweventos.com.br')
+URL_LOGIN = '/sistema/not/acesso/login'
+URL_RELATORIO = '/sistema/{edicao}/relinscricoesexcel/inscricoes'
+
+CHROMIUM = "/usr/bin/chromium"
+CHROMEDRIVER = "/usr/bin/chromedriver"
+
+TIMEOUT_LOGIN = 20
+TIMEOUT_DOWNLOAD = 60
+MAX_NAVEGADORES = 3
+
+AGRUPADORES = ['agrupador_inscricao', 'agrupador_dados_pessoais', 'agrupador_dados_contato',
+               'agrupador_dados_complementares', 'agrupador_dados_correspondencia',
+               'agrupador_transporte_ida', 'agrupador_transporte_volta',
+               'agrupador_hospedagem', 'agrupador_cobranca']
+
+# `dados` só vem preenchido no download HTTP em memória (cliente_http)
+Download = namedtuple('Download', ['subdominio', 'edicao', 'caminho', 'erro', 'espera', 'dados'], defaults=[None, None])
+
+
+def credencial(usuario, senha):
+    """Identifica quem está logado numa sessão reaproveitada, sem guardar a senha."""
+    return hashlib.blake2b(f'{usuario}\x00{senha}'.encode(), digest_size=16).hexdigest()
+
+
+def url(subdominio, caminho):
+    return URL_BASE.format(subdominio=subdominio) + caminho
+
+
+def novo_navegador():
+    # Configuração Selenium para Linux/Streamlit Cloud
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--window-size=1920,1080")
+    chrome_options.binary_location = CHROMIUM
+    service = Service(CHROMEDRIVER)
+    return webdriver.Chrome(service=service, options=chrome_options)
+
+
+class PoolNavegadores:
+    """Pool limitado de sessões WebDriver reaproveitáveis.
+
+    Uma sessão que falhou durante o uso é descartada (quit), pois pode ter
+    ficado numa página ou estado inválido; as demais voltam para o pool.
+    """
+
+    def __init__(self, tamanho=MAX_NAVEGADORES, fabrica=None):
+        self.tamanho = tamanho
+        self._fabrica = fabrica or novo_navegador
+        self._livres = queue.LifoQueue()
+        self._vagas = threading.BoundedSemaphore(tamanho)
+
+    @contextmanager
+    def navegador(self):
+        with self._vagas:
+            try:
+                driver = self._livres.get_nowait()
+            except queue.Empty:
+                driver = self._fabrica()
+            try:
+                yield driver
+            except BaseException:
+                _encerrar(driver)
+                raise
+            self._livres.put(driver)
+
+    def fechar(self):
+        while True:
+            try:
+                _encerrar(self._livres.get_nowait())
+            except queue.Empty:
+                return
+
+
+def _encerrar(driver):
+    try: driver.quit()
+    except Exception: pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def pool_padrao():
+    """Pool do processo, compartilhado entre sessões e reruns do Streamlit."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PoolNavegadores()
+            atexit.register(_pool.fechar)
+        return _pool
+
+
+def find_any(driver, locators, timeout=TIMEOUT_LOGIN):
+    """Espera até que qualquer um dos localizadores apareça (uma única espera)."""
+    try:
+        return WebDriverWait(driver, timeout).until(
+            EC.any_of(*[EC.presence_of_element_located(loc) for loc in locators]))
+    except TimeoutException:
+        return None
+
+
+@medicao.medido('login')
+def login(driver, subdominio, usuario, senha):
+    driver.get(url(subdominio, URL_LOGIN))
+    user_field = find_any(driver, [(By.NAME, "login"), (By.ID, "usuario"), (By.ID, "login")])
+    pass_field = find_any(driver, [(By.NAME, "senha"), (By.ID, "senha")])
+    if not (user_field and pass_field):
+        raise Exception("Campos de login não encontrados.")
+
+    user_field.send_keys(usuario)
+    pass_field.send_keys(senha)
+    try: pass_field.submit()
+    except Exception:
+        btn = find_any(driver, [(By.CSS_SELECTOR, "button[type='submit']"), (By.ID, "btnEntrar")])
+        if btn: btn.click()
+
+    # Espera explícita pela saída da tela de login (substitui o sleep fixo)
+    try:
+        WebDriverWait(driver, TIMEOUT_LOGIN).until(lambda d: "login" not in d.current_url)
+    except TimeoutException:
+        raise Exception("Login falhou. Verifique usuário e senha.")
+
+
+def baixar_export(driver, subdominio, edicao, usuario, senha, pasta, status=None):
+    """Baixa o export de uma edição para `pasta`. Devolve (caminho, segundos de espera do download)."""
+    avisar = status or (lambda msg: None)
+    driver.execute_cdp_cmd('Page.setDownloadBehavior', {'behavior': 'allow', 'downloadPath': pasta})
+
+    # Sessões reaproveitadas já podem estar logadas neste subdomínio, mas só
+    # valem para a mesma credencial: de outro usuário, os cookies são apagados
+    dono = credencial(usuario, senha)
+    if getattr(driver, 'iwe_credencial', dono) != dono:
+        driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+    driver.iwe_credencial = dono
+    avisar(f"📍 Acessando edição {edicao}...")
+    relatorio = url(subdominio, URL_RELATORIO.format(edicao=edicao))
+    driver.get(relatorio)
+    if "login" in driver.current_url:
+        avisar("🔑 Acessando sistema...")
+        login(driver, subdominio, usuario, senha)
+        driver.get(relatorio)
+        if "login" in driver.current_url:
+            raise Exception("Login falhou. Verifique usuário e senha.")
+
+    # Checkboxes (Via JS para garantir)
+    avisar("☑️ Selecionando dados...")
+    WebDriverWait(driver, TIMEOUT_LOGIN).until(EC.presence_of_element_located((By.ID, 'btGerar')))
+    driver.execute_script("""
+        arguments[0].forEach(cls => {
+            var el = document.getElementsByClassName(cls)[0];
+            if(el) el.click();
+        });
+    """, AGRUPADORES)
+
+    avisar("⬇️ Baixando Excel...")
+    with medicao.etapa('download', edicao=edicao), MonitorDownload(pasta) as monitor:
+        driver.execute_script("document.getElementById('btGerar').click();")
+        try:
+            caminho = monitor.esperar(TIMEOUT_DOWNLOAD)
+        except TimeoutError:
+            raise Exception("Download não finalizado.")
+    avisar(f"✅ Download concluído em {monitor.segundos:.1f}s ({monitor.modo})")
+    return caminho, monitor.segundos
+
+
+def baixar(subdominio, edicao, usuario, senha, pool=None, status=None, pasta_base=None):
+    """Baixa uma edição usando um navegador do pool, numa pasta temporária própria
+    (dentro de `pasta_base`, ex.: a pasta da tarefa da fila, se dada)."""
+    pool = pool or pool_padrao()
+    pasta = tempfile.mkdtemp(prefix=f'iweventos_{edicao}_', dir=pasta_base)
+    try:
+        with pool.navegador() as driver:
+            caminho, espera = baixar_export(driver, subdominio, edicao, usuario, senha, pasta, status)
+        return Download(subdominio, edicao, caminho, None, espera)
+    except Exception as e:
+        shutil.rmtree(pasta, ignore_errors=True)
+        return Download(subdominio, edicao, None, e)
+
+
+def baixar_lote(jobs, usuario, senha, pool=None, pasta_base=None):
+    """Baixa várias edições em paralelo; gera os resultados conforme terminam.
+
+    `jobs` é uma lista de pares (subdominio, edicao). O paralelismo é limitado
+    pelo tamanho do pool de navegadores.
+    """
+    pool = pool or pool_padrao()
+    with ThreadPoolExecutor(max_workers=pool.tamanho) as ex:
+        futuros = [ex.submit(medicao.propagar(baixar), sub, ed, usuario, senha, pool, None, pasta_base)
+                   for sub, ed in jobs]
+        for f in as_completed(futuros):
+            yield f.result()
+
+
+def ler_jobs(texto, subdominio_padrao):
+    """Uma edição por linha: 'subdominio/edicao', 'subdominio edicao' ou só 'edicao'."""
+    jobs = []
+    for linha in texto.splitlines():
+        partes = [p for p in re.split(r'[\s/;,]+', linha.strip()) if p]
+        if len(partes) == 1:
+            jobs.append((subdominio_padrao, partes[0]))
+        elif len(partes) >= 2:
+            jobs.append((partes[0], partes[1]))
+    return list(dict.fromkeys(jobs))
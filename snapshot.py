@@ -0,0 +1,183 @@
+"""Atualização incremental do relatório por evento (SQLite).
+
+Cada evento tem um arquivo SQLite, identificado por um id estável (no robô,
+'subdominio/edicao'; no upload e no modo em lote, informado pelo usuário) e
+não pelo título do relatório, que é texto livre. O arquivo guarda uma linha
+limpa por inscrição (já reduzida às dimensões das contagens, ver
+agregacao.dimensoes), o hash da linha bruta e as contagens longas. A cada
+novo export só as inscrições novas, alteradas ou removidas (pela chave de
+inscrição) são limpas, e só os deltas vão para as contagens. O resultado é
+o mesmo do cálculo completo: o formato das datas é inferido no export
+inteiro (se mudar, o snapshot é refeito) e as faixas etárias, que dependem
+da data de hoje, são reavaliadas quando o dia muda.
+"""
+import json
+import os
+import re
+import sqlite3
+import uuid
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from agregacao import CHAVE_CONTAGEM, DIMENSOES, contagens, dimensoes, somar
+from cache import CacheLRU
+from limpeza import (MAPEAMENTO_VERSAO, calc_idade, data_nasc, formatos_data, fx_etaria, limpar, mapear_colunas,
+                     normalizar)
+from medicao import medido
+
+PASTA = os.environ.get('RELATORIO_SNAPSHOTS', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshots'))
+
+COLUNAS_LINHA = ['chave', 'hash'] + DIMENSOES + ['Status', 'Nasc']
+
+ESQUEMA = f"""
+CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT);
+CREATE TABLE IF NOT EXISTS linhas ({', '.join(c + (' TEXT PRIMARY KEY' if c == 'chave' else '') for c in COLUNAS_LINHA)});
+CREATE TABLE IF NOT EXISTS contagens (dimensao TEXT, valor, status TEXT, n INTEGER,
+                                      PRIMARY KEY (dimensao, valor, status));
+"""
+
+
+def arquivo(id_evento, pasta=PASTA):
+    nome = re.sub(r'[^A-Z0-9]+', '_', normalizar(str(id_evento))).strip('_') or 'EVENTO'
+    return os.path.join(pasta, f"{nome}.sqlite")
+
+
+def chaves(bruto):
+    """Nº de inscrição; se faltar ou repetir, Nome + DataInscricao + ordem de ocorrência."""
+    k = bruto['Inscricao']
+    if k.notna().all() and k.is_unique:
+        return k.astype(str)
+    base = bruto['Nome'].astype(str) + '|' + bruto['DataInscricao'].astype(str)
+    return base + '#' + base.groupby(base).cumcount().astype(str)
+
+
+def hash_linhas(bruto):
+    """Hash por linha: cada coluna é fatorada e só os valores distintos passam pelo hash."""
+    h = np.zeros(len(bruto), dtype='uint64')
+    for c in bruto.columns:
+        codigos, unicos = pd.factorize(bruto[c], use_na_sentinel=False)
+        hu = pd.util.hash_array(np.asarray(unicos, dtype=object), categorize=False)
+        h = h * np.uint64(1000003) ^ hu[codigos]
+    return h.view('int64')
+
+
+# chave -> hash da última gravação de cada arquivo, validado pelo token
+# 'geracao' do meta (outro processo que grave o arquivo invalida a cópia)
+_hashes = CacheLRU(8)
+
+
+def _linhas(conn, chaves_):
+    """Linhas gravadas para as chaves dadas (via tabela temporária, sem IN gigante)."""
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS _sel (chave TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM _sel")
+    conn.executemany("INSERT INTO _sel VALUES (?)", ((c,) for c in chaves_))
+    return pd.read_sql("SELECT l.* FROM linhas l JOIN _sel USING (chave)", conn)
+
+
+def _aplicar(conn, delta):
+    d = delta[delta['n'] != 0]
+    conn.executemany(
+        "INSERT INTO contagens (dimensao, valor, status, n) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT (dimensao, valor, status) DO UPDATE SET n = n + excluded.n",
+        zip(d['dimensao'].tolist(), d['valor'].tolist(), d['status'].tolist(), d['n'].tolist()))
+    conn.execute("DELETE FROM contagens WHERE n = 0")
+
+
+def _diferenca(entra, sai):
+    return somar([contagens(entra), contagens(sai).assign(n=lambda c: -c['n'])])
+
+
+def _atualizar_idades(conn, agora):
+    """Faixa etária depende de hoje: recalcula e corrige só quem mudou de faixa."""
+    l = pd.read_sql("SELECT chave, Nasc, FaixaEtaria, Status FROM linhas", conn)
+    nova = fx_etaria(calc_idade(pd.to_datetime(l['Nasc']), agora))
+    mud = l[nova.to_numpy() != l['FaixaEtaria'].to_numpy()]
+    if mud.empty:
+        return
+    nova = nova[mud.index]
+    delta = pd.concat([
+        pd.DataFrame({'dimensao': 'FaixaEtaria', 'valor': nova.to_numpy(), 'status': mud['Status'].to_numpy(), 'n': 1}),
+        pd.DataFrame({'dimensao': 'FaixaEtaria', 'valor': mud['FaixaEtaria'].to_numpy(), 'status': mud['Status'].to_numpy(), 'n': -1}),
+    ]).groupby(CHAVE_CONTAGEM, sort=False)['n'].sum().reset_index()
+    _aplicar(conn, delta)
+    conn.executemany("UPDATE linhas SET FaixaEtaria = ? WHERE chave = ?", zip(nova.tolist(), mud['chave'].tolist()))
+
+
+@medido('incremental', linhas=lambda r: r[1]['novos'] + r[1]['alterados'] + r[1]['iguais'])
+def atualizar(id_evento, df, pasta=PASTA, agora=None):
+    """Aplica o export `df` ao snapshot do evento `id_evento`.
+
+    Devolve (contagens longas, resumo) onde resumo conta novos/alterados/
+    removidos/iguais. Levanta IndexError se o export não tem o layout esperado.
+    """
+    agora = agora or datetime.now()
+    bruto = mapear_colunas(df).dropna(subset=['Nome'])
+    bruto.index = chaves(bruto)
+    hashes = pd.Series(hash_linhas(bruto), index=bruto.index)
+    # Como no cálculo completo, o formato vem do export inteiro, não só das linhas alteradas
+    formatos = formatos_data(bruto)
+    formatos_json = json.dumps(formatos, sort_keys=True)
+
+    os.makedirs(pasta, exist_ok=True)
+    caminho = arquivo(id_evento, pasta)
+    geracao = uuid.uuid4().hex
+    conn = sqlite3.connect(caminho, timeout=30, isolation_level=None)
+    try:
+        # Transação única: duas sessões no mesmo evento se serializam aqui
+        conn.execute("BEGIN IMMEDIATE")
+        meta = dict(conn.execute("SELECT k, v FROM meta").fetchall()) if _tem_tabela(conn, 'meta') else {}
+        if meta.get('versao') != str(MAPEAMENTO_VERSAO) or meta.get('formatos') != formatos_json:
+            for t in ('meta', 'linhas', 'contagens'):
+                conn.execute(f"DROP TABLE IF EXISTS {t}")
+            meta = {}
+        for stmt in ESQUEMA.split(';'):
+            if stmt.strip(): conn.execute(stmt)
+        if meta.get('data_ref') not in (None, agora.date().isoformat()):
+            _atualizar_idades(conn, agora)
+
+        antigos = _hashes.get((caminho, meta.get('geracao')))
+        if antigos is None:
+            antigos = pd.read_sql("SELECT chave, hash FROM linhas", conn, index_col='chave')['hash']
+        pos = antigos.index.get_indexer(hashes.index)
+        existe = pos >= 0
+        igual = existe.copy()
+        igual[existe] = antigos.to_numpy()[pos[existe]] == hashes.to_numpy()[existe]
+        fica = np.zeros(len(antigos), dtype=bool)
+        fica[pos[igual]] = True
+        sai_chaves = antigos.index[~fica]
+        entra_chaves = hashes.index[~igual]
+
+        sai = _linhas(conn, sai_chaves.tolist())
+        limpo = limpar(bruto.loc[entra_chaves], formatos)
+        entra = dimensoes(limpo)
+        entra['Nasc'] = data_nasc(limpo['Nasc']).dt.strftime('%Y-%m-%dT%H:%M:%S')
+        entra['hash'] = hashes[entra.index]
+        entra['chave'] = entra.index
+
+        _aplicar(conn, _diferenca(entra, sai))
+        conn.executemany("DELETE FROM linhas WHERE chave = ?", ((c,) for c in sai_chaves.tolist()))
+        valores = entra[COLUNAS_LINHA].astype(object)
+        conn.executemany(f"INSERT INTO linhas VALUES ({', '.join('?' * len(COLUNAS_LINHA))})",
+                         valores.where(valores.notna(), None).itertuples(index=False, name=None))
+        conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                         [('versao', str(MAPEAMENTO_VERSAO)), ('data_ref', agora.date().isoformat()),
+                          ('formatos', formatos_json), ('geracao', geracao)])
+        cont = pd.read_sql("SELECT dimensao, valor, status, n FROM contagens", conn)
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+    _hashes.put((caminho, geracao), hashes)
+    n_iguais, n_comuns = int(igual.sum()), int(existe.sum())
+    resumo = {'novos': len(hashes) - n_comuns, 'alterados': n_comuns - n_iguais,
+              'removidos': len(antigos) - n_comuns, 'iguais': n_iguais}
+    return cont, resumo
+
+
+def _tem_tabela(conn, nome):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (nome,)).fetchone() is not None
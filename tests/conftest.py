@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mock_iweventos  # noqa: E402
+import robo  # noqa: E402
+
+
+@pytest.fixture
+def iweventos(monkeypatch):
+    """Mock do iweventos numa porta livre, com robo.URL_BASE apontando para ele."""
+    servidor, base = mock_iweventos.iniciar(linhas=50)
+    monkeypatch.setattr(robo, 'URL_BASE', base)
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
@@ -0,0 +1,73 @@
+import threading
+
+import cliente_http
+import mock_iweventos
+from cliente_http import ClienteIweventos, baixar_http, baixar_lote_http
+
+
+def test_download_unico(iweventos):
+    d = baixar_http('ccm', 'dic2025', 'teste', 'teste', ClienteIweventos())
+    assert d.erro is None
+    assert d.caminho == 'inscricoes_dic2025.csv'
+    assert d.dados == mock_iweventos.gerar_csv('dic2025', iweventos.linhas)
+
+
+def test_senha_errada(iweventos):
+    d = baixar_http('ccm', 'dic2025', 'teste', 'errada', ClienteIweventos())
+    assert d.dados is None and 'Login falhou' in str(d.erro)
+    assert not iweventos.sessoes
+
+
+def test_lote_concorrente_sessao_compartilhada(iweventos, monkeypatch):
+    logins = []
+    login = ClienteIweventos.login
+
+    def contar(self, *args):
+        logins.append(threading.get_ident())
+        return login(self, *args)
+
+    monkeypatch.setattr(ClienteIweventos, 'login', contar)
+    cliente = ClienteIweventos()
+    jobs = [('ccm', f'ed{i}') for i in range(8)]
+    downloads = list(baixar_lote_http(jobs, 'teste', 'teste', cliente, max_paralelo=4))
+
+    assert sorted((d.subdominio, d.edicao) for d in downloads) == sorted(jobs)
+    for d in downloads:
+        assert d.erro is None
+        assert d.dados == mock_iweventos.gerar_csv(d.edicao, iweventos.linhas)
+    # Um único login para o subdomínio, compartilhado pelas threads
+    assert len(logins) == 1 and len(iweventos.sessoes) == 1
+
+
+def test_pagina_html_no_lugar_do_export(iweventos):
+    iweventos.erro_export.add('quebrada')
+    cliente = ClienteIweventos()
+    d = baixar_http('ccm', 'quebrada', 'teste', 'teste', cliente)
+    assert d.dados is None and 'página em vez do export' in str(d.erro)
+    # A sessão continua boa para as demais edições
+    assert baixar_http('ccm', 'dic2025', 'teste', 'teste', cliente).erro is None
+
+
+def test_cliente_por_credencial():
+    assert cliente_http.cliente_para('a', 'x') is cliente_http.cliente_para('a', 'x')
+    assert cliente_http.cliente_para('a', 'x') is not cliente_http.cliente_para('a', 'y')
+
+
+
+def test_formulario_select_e_textarea():
+    html = """<form method="post" action="/x">
+      <select name="formato"><option value="xlsx">Excel</option><option value="csv" selected>CSV</option></select>
+      <select name="sem_selecao"><option disabled>--</option><option>Primeira  opção</option></select>
+      <select name="varios" multiple><option value="a" selected>A</option><option value="b">B</option>
+        <option value="c" selected>C</option></select>
+      <select name="desligado" disabled><option value="z" selected>Z</option></select>
+      <textarea name="obs">
+linha 1
+linha 2</textarea>
+      <textarea name="vazio"></textarea>
+      <input type="text" name="texto" value="t">
+    </form>"""
+    form, = cliente_http._formularios(html)
+    assert cliente_http._dados_form(form) == [
+        ('formato', 'csv'), ('sem_selecao', 'Primeira opção'), ('varios', 'a'), ('varios', 'c'),
+        ('obs', 'linha 1\nlinha 2'), ('vazio', ''), ('texto', 't')]
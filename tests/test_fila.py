@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+import medicao
+from fila import CONCLUIDA, ERRO, Fila
+
+
+def etapa_no_filho(n):
+    with medicao.etapa('conta', linhas=n):
+        return os.getpid(), sum(range(n))
+
+
+def falha_no_filho():
+    with medicao.etapa('quebra'):
+        raise ValueError('falhou no filho')
+
+
+@pytest.fixture
+def fila():
+    f = Fila(workers=2, processos=1)
+    yield f
+    f.fechar()
+
+
+def test_tarefa_e_deduplicacao(fila):
+    t1 = fila.submeter('k', lambda t, x: x * 2, 21)
+    t2 = fila.submeter('k', lambda t, x: x * 3, 21)
+    assert t1.esperar(10)
+    assert t2 is t1 or t2.esperar(10)
+    assert t1.estado == CONCLUIDA and t1.resultado == 42
+    assert fila.tarefa(t1.id) is t1
+
+
+def test_em_processo(fila):
+    t = fila.submeter('p', lambda t: t.em_processo(etapa_no_filho, 1000))
+    assert t.esperar(60), t.mensagem
+    pid, total = t.resultado
+    assert pid != os.getpid() and total == sum(range(1000))
+    # A etapa medida no filho volta para a medição da tarefa
+    assert [(e['etapa'], e['linhas']) for e in t.medicao.etapas] == [('conta', 1000)]
+
+
+def test_em_processo_erro(fila):
+    t = fila.submeter('e', lambda t: t.em_processo(falha_no_filho))
+    assert t.esperar(60)
+    assert t.estado == ERRO and isinstance(t.erro, ValueError)
+    assert t.medicao.etapas[-1]['etapa'] == 'quebra' and 'erro' in t.medicao.etapas[-1]
@@ -0,0 +1,20 @@
+import pandas as pd
+
+from graficos import grafico_evolucao
+
+
+def evolucao(datas):
+    idx = pd.DatetimeIndex(datas)
+    return pd.DataFrame({'Pago': range(len(idx)), 'Cortesia': 0, 'Aberto': 1}, index=idx)
+
+
+def test_evolucao_rotulos():
+    img = grafico_evolucao(evolucao(['2025-12-21', '2025-12-28', '2026-01-04', '2026-01-11']), 'svg')
+    assert img.mime == 'image/svg+xml'
+    svg = img.dados.decode()
+    assert 'Dec' in svg and '2026' in svg
+
+
+def test_evolucao_vazia():
+    img = grafico_evolucao(evolucao([]), 'png')
+    assert img.dados[:8] == b'\x89PNG\r\n\x1a\n'
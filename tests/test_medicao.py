@@ -0,0 +1,51 @@
+import threading
+
+import medicao
+
+
+def test_etapas_aninhadas():
+    with medicao.coletar() as m:
+        with medicao.etapa('fora'):
+            with medicao.etapa('dentro', linhas=3):
+                pass
+    assert [(e['etapa'], e['pai'], e['linhas']) for e in m.etapas] == [('dentro', 'fora', 3), ('fora', None, None)]
+    assert not any('pico_compartilhado' in e for e in m.etapas)
+
+
+def test_sem_coletar_nao_registra():
+    with medicao.etapa('solta') as e:
+        e.linhas = 1
+    assert medicao._raizes == 0
+
+
+def test_etapas_sobrepostas_nao_zeram_o_pico(monkeypatch):
+    zerados = []
+    monkeypatch.setattr(medicao, '_zerar_pico', lambda: zerados.append(threading.get_ident()) or True)
+    juntas = threading.Barrier(2)
+    medicoes = []
+
+    def tarefa():
+        with medicao.coletar() as m:
+            medicoes.append(m)
+            with medicao.etapa('limpeza'):
+                juntas.wait()
+                with medicao.etapa('agregacao'):
+                    pass
+                juntas.wait()
+
+    threads = [threading.Thread(target=tarefa) for _ in range(2)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+
+    # Só a primeira etapa a começar (sozinha) zera o pico; o resto sai marcado
+    assert len(zerados) == 1
+    etapas = [e for m in medicoes for e in m.etapas]
+    assert len(etapas) == 4 and all(e.get('pico_compartilhado') for e in etapas)
+    assert medicao._raizes == 0
+
+    zerados.clear()
+    with medicao.coletar() as m:
+        with medicao.etapa('limpeza'):
+            with medicao.etapa('agregacao'):
+                pass
+    assert len(zerados) == 2 and not any('pico_compartilhado' in e for e in m.etapas)
@@ -0,0 +1,48 @@
+from datetime import datetime
+from io import BytesIO
+
+import pandas as pd
+
+import cache
+import mock_iweventos
+import processamento
+from processamento import Job, nome_pdf, nomes_pdf
+
+
+def test_nome_pdf():
+    assert nome_pdf('SOBED DAYS', '2026') == 'Relatorio_SOBED_DAYS_2026.pdf'
+
+
+def test_nomes_pdf_unicos_no_lote():
+    jobs = [Job('exports/sp.xlsx', 'SOBED', '2026'), Job('exports/rj norte.csv', 'SOBED', '2026'),
+            Job('exports/ccm.xlsx', 'CCM', '2026'), Job('exports/ccm.xlsx', 'CCM', '2025')]
+    assert nomes_pdf(jobs) == ['Relatorio_SOBED_2026_sp.pdf', 'Relatorio_SOBED_2026_rj_norte.pdf',
+                               'Relatorio_CCM_2026.pdf', 'Relatorio_CCM_2025.pdf']
+
+
+def test_nomes_pdf_mesmo_export_em_pastas_diferentes():
+    jobs = [Job('a/export.csv', 'SOBED', '2026'), Job('b/export.csv', 'SOBED', '2026')]
+    assert nomes_pdf(jobs) == ['Relatorio_SOBED_2026_export.pdf', 'Relatorio_SOBED_2026_export_2.pdf']
+
+
+def test_limpeza_em_cache_so_vale_no_mesmo_dia(monkeypatch):
+    df = pd.read_csv(BytesIO(mock_iweventos.gerar_csv('dia', 50)), dtype=str)
+    chamadas = []
+    limpar = processamento.limpar
+    monkeypatch.setattr(processamento, 'limpar', lambda d: chamadas.append(1) or limpar(d))
+
+    class Relogio(datetime):
+        agora = datetime(2026, 3, 1, 10)
+
+        @classmethod
+        def now(cls, tz=None):
+            return cls.agora
+
+    monkeypatch.setattr(processamento, 'datetime', Relogio)
+    cache.CACHES['limpeza'].limpar()
+    processamento.agregados(df, 'chave-dia')
+    processamento.agregados(df, 'chave-dia')
+    assert len(chamadas) == 1
+    Relogio.agora = datetime(2026, 3, 2, 10)
+    processamento.agregados(df, 'chave-dia')
+    assert len(chamadas) == 2
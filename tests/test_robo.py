@@ -0,0 +1,44 @@
+import os
+
+import pytest
+
+import robo
+
+tem_navegador = robo.HAS_SELENIUM and os.path.exists(robo.CHROMIUM) and os.path.exists(robo.CHROMEDRIVER)
+
+
+@pytest.mark.skipif(not tem_navegador, reason='Chromium/chromedriver não instalados')
+def test_lote_uma_pasta_por_job(iweventos, tmp_path):
+    jobs = [('ccm', 'dic2024'), ('ccm', 'dic2025'), ('outro', 'abc2025')]
+    pool = robo.PoolNavegadores(2)
+    try:
+        downloads = list(robo.baixar_lote(jobs, 'teste', 'teste', pool=pool, pasta_base=str(tmp_path)))
+    finally:
+        pool.fechar()
+
+    assert sorted((d.subdominio, d.edicao) for d in downloads) == sorted(jobs)
+    assert all(d.erro is None for d in downloads), [d.erro for d in downloads]
+    pastas = {os.path.dirname(d.caminho) for d in downloads}
+    assert len(pastas) == len(jobs)
+    assert all(os.path.dirname(p) == str(tmp_path) for p in pastas)
+    for d in downloads:
+        with open(d.caminho, 'rb') as f:
+            assert f.read().startswith(b'Coluna 0,')
+        assert os.path.basename(d.caminho) == f'inscricoes_{d.edicao}.csv'
+
+
+@pytest.mark.skipif(not tem_navegador, reason='Chromium/chromedriver não instalados')
+def test_lote_senha_errada(iweventos, tmp_path):
+    pool = robo.PoolNavegadores(1)
+    try:
+        downloads = list(robo.baixar_lote([('ccm', 'dic2025')], 'teste', 'errada', pool=pool,
+                                          pasta_base=str(tmp_path)))
+    finally:
+        pool.fechar()
+    assert downloads[0].caminho is None and 'Login falhou' in str(downloads[0].erro)
+    assert os.listdir(tmp_path) == []  # a pasta do job que falhou é apagada
+
+
+def test_ler_jobs():
+    assert robo.ler_jobs('dic2024\nccm/dic2025\noutro abc2025\ndic2024\n', 'ccm') == [
+        ('ccm', 'dic2024'), ('ccm', 'dic2025'), ('outro', 'abc2025')]
@@ -0,0 +1,77 @@
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+import mock_iweventos
+import snapshot
+from agregacao import CHAVE_CONTAGEM, contagens, dimensoes
+from limpeza import limpar, mapear_colunas
+
+
+def export(edicao='dic2025', linhas=200):
+    return pd.read_csv(BytesIO(mock_iweventos.gerar_csv(edicao, linhas)), dtype=str, keep_default_na=False)
+
+
+def completo(df):
+    """Contagens do cálculo completo, sem snapshot."""
+    return contagens(dimensoes(limpar(mapear_colunas(df))))
+
+
+def normalizar(cont):
+    c = cont[cont['n'] != 0].astype({'valor': str})
+    return c.sort_values(CHAVE_CONTAGEM).reset_index(drop=True)[CHAVE_CONTAGEM + ['n']]
+
+
+def com_datas_iso(df, inicio, n):
+    """`n` inscrições novas com DataInscricao em aaaa-mm-dd (formato diferente do export)."""
+    novas = df.iloc[:n].copy()
+    novas['Coluna 0'] = [str(900000 + inicio + i) for i in range(n)]
+    novas['Coluna 13'] = [f'2025-03-{1 + i % 28:02d} 10:00' for i in range(n)]
+    novas['Coluna 5'] = ''
+    return pd.concat([df, novas], ignore_index=True)
+
+
+@pytest.fixture
+def pasta(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, '_hashes', snapshot.CacheLRU(8))
+    return str(tmp_path)
+
+
+def test_incremental_igual_ao_completo(pasta):
+    df = export()
+    cont, resumo = snapshot.atualizar('ccm/dic2025', df, pasta)
+    assert resumo == {'novos': 200, 'alterados': 0, 'removidos': 0, 'iguais': 0}
+    pd.testing.assert_frame_equal(normalizar(cont), normalizar(completo(df)))
+
+    df2 = df.drop(index=[3, 4]).copy()
+    df2.loc[10, 'Coluna 2'] = 'Palestrante'
+    cont, resumo = snapshot.atualizar('ccm/dic2025', df2, pasta)
+    assert resumo == {'novos': 0, 'alterados': 1, 'removidos': 2, 'iguais': 197}
+    pd.testing.assert_frame_equal(normalizar(cont), normalizar(completo(df2)))
+
+
+def test_formato_de_data_vem_do_export_inteiro(pasta):
+    df = export()
+    snapshot.atualizar('ccm/dic2025', df, pasta)
+    # Só as linhas novas têm outro formato: no export inteiro vale o dd/mm/aaaa da
+    # 1ª linha, então elas ficam sem data (NaT) também no incremental
+    df2 = com_datas_iso(df, 0, 30)
+    cont, resumo = snapshot.atualizar('ccm/dic2025', df2, pasta)
+    assert resumo['novos'] == 30 and resumo['iguais'] == 200
+    pd.testing.assert_frame_equal(normalizar(cont), normalizar(completo(df2)))
+
+
+def test_formato_muda_refaz_snapshot(pasta):
+    df = export()
+    snapshot.atualizar('ccm/dic2025', df, pasta)
+    # A 1ª linha passa a ter data ISO: o formato inferido muda para o export todo
+    df2 = pd.concat([com_datas_iso(df, 0, 1).iloc[[-1]], df], ignore_index=True)
+    cont, resumo = snapshot.atualizar('ccm/dic2025', df2, pasta)
+    assert resumo['novos'] == len(df2)
+    pd.testing.assert_frame_equal(normalizar(cont), normalizar(completo(df2)))
+
+
+def test_arquivo_pelo_id_do_evento(pasta):
+    assert snapshot.arquivo('ccm/dic2025', pasta) == snapshot.arquivo('CCM DIC2025', pasta)
+    assert snapshot.arquivo('ccm/dic2025', pasta) != snapshot.arquivo('ccm/dic2024', pasta)
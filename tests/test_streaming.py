@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+
+import benchmark
+from ingestao import ler_blocos, ler_export
+from processamento import agregados, agregados_blocos
+
+LINHAS = 1500
+
+
+def iguais(a, b):
+    for campo in a._fields:
+        x, y = getattr(a, campo), getattr(b, campo)
+        if isinstance(x, pd.DataFrame):
+            pd.testing.assert_frame_equal(x, y, check_exact=True)
+        elif isinstance(x, pd.Series):
+            pd.testing.assert_series_equal(x, y, check_exact=True)
+        else:
+            assert x == y, campo
+
+
+@pytest.fixture(scope='module')
+def exports(tmp_path_factory):
+    pasta = tmp_path_factory.mktemp('exports')
+    df = benchmark.gerar_export(LINHAS, semente=3)
+    # Datas de inscrição em dois formatos: vale o do 1º bloco, como na leitura completa
+    df.loc[1000:, 'Coluna 13'] = df.loc[1000:, 'Coluna 13'].str[:10]
+    caminhos = {'csv': pasta / 'export.csv', 'xlsx': pasta / 'export.xlsx', 'openpyxl.xlsx': pasta / 'openpyxl.xlsx'}
+    df.to_csv(caminhos['csv'], index=False)
+    benchmark.salvar_xlsx(df, caminhos['xlsx'])
+    df.to_excel(caminhos['openpyxl.xlsx'], index=False)
+    # (caminho, bytes, agregados do cálculo completo) por formato
+    saida = {}
+    for formato, caminho in caminhos.items():
+        dados = caminho.read_bytes()
+        saida[formato] = str(caminho), dados, agregados(ler_export(dados, str(caminho)))[0]
+    return saida
+
+
+@pytest.mark.parametrize('formato', ['csv', 'xlsx', 'openpyxl.xlsx'])
+@pytest.mark.parametrize('bloco', [400, 777, 10 ** 6])
+def test_streaming_igual_ao_completo(exports, formato, bloco):
+    caminho, dados, completo = exports[formato]
+    iguais(completo, agregados_blocos(ler_blocos(caminho, caminho, bloco)))
+    iguais(completo, agregados_blocos(ler_blocos(dados, caminho, bloco)))